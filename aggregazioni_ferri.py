@@ -0,0 +1,346 @@
+"""
+Aggregazioni precalcolate sui dati dei ferri strutturali
+Il cubo Elemento × Piano × Diametro contiene somma, conteggio, minimo, massimo
+e momento secondo per ogni combinazione, più i rollup "Tutti" (chiave None) su
+ogni dimensione: una selezione di filtri diventa una lettura di dizionario invece
+di una scansione, e una selezione multipla l'unione di poche celle.
+L'accumulatore di statistiche produce gli stessi valori in una passata e si può
+unire tra parti calcolate separatamente (shard, processi).
+"""
+
+import math
+import operator
+import threading
+from collections import OrderedDict
+from itertools import product
+
+from dataset_ferri import normalizza_selezione
+
+# Dimensioni del cubo, nell'ordine delle chiavi
+DIMENSIONI = ('elemento', 'piano', 'diametro')
+
+# Valore di rollup ("Tutti") in una chiave del cubo
+TUTTI = None
+
+# Righe per blocco nell'accumulatore: ogni blocco è ridotto con le funzioni built-in
+BLOCCO_STATISTICHE = 1 << 14
+
+# Gerarchie filtrate tenute in cache per cubo (le meno usate di recente vengono scartate)
+GERARCHIE_IN_CACHE = 32
+
+
+def unisci_momenti(conteggio_a, somma_a, m2_a, conteggio_b, somma_b, m2_b):
+    """Momento secondo di due parti unite (Chan et al.), senza riscansionare i dati"""
+    if not conteggio_a:
+        return m2_b
+    if not conteggio_b:
+        return m2_a
+    delta = somma_b / conteggio_b - somma_a / conteggio_a
+    return m2_a + m2_b + delta * delta * conteggio_a * conteggio_b / (conteggio_a + conteggio_b)
+
+
+def _unisci(cella, somma, conteggio, minimo, massimo, m2=0.0):
+    cella[4] = unisci_momenti(cella[1], cella[0], cella[4], conteggio, somma, m2)
+    cella[0] += somma
+    cella[1] += conteggio
+    if minimo < cella[2]:
+        cella[2] = minimo
+    if massimo > cella[3]:
+        cella[3] = massimo
+
+
+class AccumulatoreStatistiche:
+    """Conteggio, somma, minimo, massimo, media, varianza e valori distinti in una passata"""
+
+    def __init__(self):
+        self.conteggio = 0
+        self.somma = 0.0
+        self.m2 = 0.0
+        self.minimo = None
+        self.massimo = None
+        self.distinti = {dimensione: set() for dimensione in DIMENSIONI}
+
+    @classmethod
+    def da_dataset(cls, dataset, blocco=BLOCCO_STATISTICHE):
+        """Una passata sulle colonne del dataset, a blocchi ridotti in C e uniti con Chan"""
+        accumulatore = cls()
+        codici = {'elemento': set(), 'piano': set()}
+        quantita = dataset.quantita
+        for inizio in range(0, len(dataset), blocco):
+            fine = inizio + blocco
+            accumulatore.aggiungi_quantita(quantita[inizio:fine])
+            codici['elemento'].update(dataset.cod_elemento[inizio:fine])
+            codici['piano'].update(dataset.cod_piano[inizio:fine])
+            accumulatore.distinti['diametro'].update(dataset.diametro[inizio:fine])
+
+        accumulatore.distinti['elemento'] = {dataset.elementi[c] for c in codici['elemento']}
+        accumulatore.distinti['piano'] = {dataset.piani[c] for c in codici['piano']}
+        return accumulatore
+
+    @classmethod
+    def unisci_tutti(cls, parti):
+        """Accumulatore unico da più accumulatori parziali"""
+        totale = cls()
+        for parte in parti:
+            totale.unisci(parte)
+        return totale
+
+    def aggiungi(self, elemento, piano, diametro, quantita):
+        """Aggiunge un singolo record (aggiornamento di Welford)"""
+        media = self.somma / self.conteggio if self.conteggio else 0.0
+        self.conteggio += 1
+        self.somma += quantita
+        self.m2 += (quantita - media) * (quantita - self.somma / self.conteggio)
+        if self.minimo is None or quantita < self.minimo:
+            self.minimo = quantita
+        if self.massimo is None or quantita > self.massimo:
+            self.massimo = quantita
+        self.distinti['elemento'].add(elemento)
+        self.distinti['piano'].add(piano)
+        self.distinti['diametro'].add(diametro)
+
+    def aggiungi_quantita(self, quantita):
+        """Aggiunge un blocco di quantità (sequenza, array o memoryview)"""
+        conteggio = len(quantita)
+        if not conteggio:
+            return
+        somma = sum(quantita)
+        media = somma / conteggio
+        # Momento secondo del blocco dagli scarti dalla sua media (non da Σq² − n·media²,
+        # che perde cifre per cancellazione), poi unione con Chan
+        scarti = [q - media for q in quantita]
+        m2 = sum(map(operator.mul, scarti, scarti))
+        self._unisci_parte(conteggio, somma, m2, min(quantita), max(quantita))
+
+    def _unisci_parte(self, conteggio, somma, m2, minimo, massimo):
+        self.m2 = unisci_momenti(self.conteggio, self.somma, self.m2, conteggio, somma, m2)
+        self.conteggio += conteggio
+        self.somma += somma
+        if self.minimo is None or minimo < self.minimo:
+            self.minimo = minimo
+        if self.massimo is None or massimo > self.massimo:
+            self.massimo = massimo
+
+    def unisci(self, altro):
+        """Unisce un accumulatore calcolato su altre righe; restituisce self"""
+        if altro.conteggio:
+            self._unisci_parte(altro.conteggio, altro.somma, altro.m2, altro.minimo, altro.massimo)
+        for dimensione, valori in altro.distinti.items():
+            self.distinti[dimensione].update(valori)
+        return self
+
+    @property
+    def media(self):
+        return self.somma / self.conteggio if self.conteggio else 0.0
+
+    @property
+    def varianza(self):
+        """Varianza della popolazione"""
+        return self.m2 / self.conteggio if self.conteggio else 0.0
+
+    def risultato(self):
+        """Statistiche con le stesse chiavi di calculate_statistics, oppure None se vuoto"""
+        if not self.conteggio:
+            return None
+        return {
+            'totale': self.somma,
+            'media': self.media,
+            'massimo': self.massimo,
+            'minimo': self.minimo,
+            'conteggio': self.conteggio,
+            'varianza': self.varianza,
+            'deviazione_standard': math.sqrt(self.varianza),
+            'elementi_unici': len(self.distinti['elemento']),
+            'piani_unici': len(self.distinti['piano']),
+            'diametri_unici': len(self.distinti['diametro'])
+        }
+
+
+class CuboFerri:
+    """Cubo di aggregazione con rollup su tutte le dimensioni"""
+
+    def __init__(self):
+        # (elemento, piano, diametro) -> [somma, conteggio, minimo, massimo, momento secondo]
+        self.celle = {}
+        self.valori = {dimensione: [] for dimensione in DIMENSIONI}
+        # Chiavi delle celle base (senza rollup), in ordine di elemento, piano e diametro
+        self.chiavi_base = []
+        # Gerarchie già calcolate, per selezione e livelli (LRU limitata, condivisa tra thread)
+        self._gerarchie = OrderedDict()
+        self._lock_gerarchie = threading.Lock()
+
+    @classmethod
+    def da_celle(cls, celle):
+        """Costruisce il cubo da celle base (elemento, piano, diametro, somma, conteggio, minimo, massimo[, m2])"""
+        cubo = cls()
+        base = {}
+        for elemento, piano, diametro, *valori in celle:
+            chiave = (elemento, piano, diametro)
+            if chiave in base:
+                _unisci(base[chiave], *valori)
+            else:
+                base[chiave] = (valori + [0.0])[:5]
+
+        # Ogni cella base contribuisce alle 8 combinazioni di valore/rollup
+        for (elemento, piano, diametro), valori in base.items():
+            for chiave in product((elemento, TUTTI), (piano, TUTTI), (diametro, TUTTI)):
+                cella = cubo.celle.get(chiave)
+                if cella is None:
+                    cubo.celle[chiave] = list(valori)
+                else:
+                    _unisci(cella, *valori)
+
+        for i, dimensione in enumerate(DIMENSIONI):
+            cubo.valori[dimensione] = sorted({chiave[i] for chiave in base})
+        cubo.chiavi_base = sorted(base)
+        return cubo
+
+    @classmethod
+    def da_dataset(cls, dataset):
+        """Costruisce il cubo con una sola passata sulle colonne codificate del dataset"""
+        base = {}
+        for e, p, d, q in zip(dataset.cod_elemento, dataset.cod_piano, dataset.diametro, dataset.quantita):
+            cella = base.get((e, p, d))
+            if cella is None:
+                base[(e, p, d)] = [q, 1, q, q, 0.0]
+            else:
+                # Aggiornamento di Welford del momento secondo
+                media = cella[0] / cella[1]
+                cella[0] += q
+                cella[1] += 1
+                cella[4] += (q - media) * (q - cella[0] / cella[1])
+                if q < cella[2]:
+                    cella[2] = q
+                if q > cella[3]:
+                    cella[3] = q
+
+        elementi = dataset.elementi
+        piani = dataset.piani
+        return cls.da_celle(
+            (elementi[e], piani[p], d, somma, conteggio, minimo, massimo, m2)
+            for (e, p, d), (somma, conteggio, minimo, massimo, m2) in base.items()
+        )
+
+    def _valori(self, campo, selezione):
+        """Chiavi del cubo per una selezione: [TUTTI] se il campo non è filtrato"""
+        valori = normalizza_selezione(selezione)
+        if valori is None:
+            return [TUTTI]
+        if campo == 'diametro':
+            return [int(v) for v in valori]
+        return valori
+
+    def _aggrega(self, elemento, piano, diametro):
+        """Unisce le celle di tutte le combinazioni selezionate (selezioni multiple)"""
+        totale = None
+        for chiave in product(self._valori('elemento', elemento),
+                              self._valori('piano', piano),
+                              self._valori('diametro', diametro)):
+            cella = self.celle.get(chiave)
+            if cella is None:
+                continue
+            if totale is None:
+                totale = list(cella)
+            else:
+                _unisci(totale, *cella)
+        return totale
+
+    def cella(self, elemento=TUTTI, piano=TUTTI, diametro=TUTTI):
+        """Aggregati per una selezione (valore, lista di valori o None = Tutti), oppure None se vuota"""
+        cella = self._aggrega(elemento, piano, diametro)
+        if cella is None:
+            return None
+        somma, conteggio, minimo, massimo, m2 = cella
+        return {
+            'somma': somma,
+            'conteggio': conteggio,
+            'minimo': minimo,
+            'massimo': massimo,
+            'media': somma / conteggio,
+            'varianza': m2 / conteggio,
+            'deviazione_standard': math.sqrt(m2 / conteggio)
+        }
+
+    def riepilogo(self, campo, elemento=TUTTI, piano=TUTTI, diametro=TUTTI):
+        """Aggregati completi per valore di un campo, rispettando i filtri sulle altre dimensioni"""
+        filtri = {'elemento': elemento, 'piano': piano, 'diametro': diametro}
+        valori = self._valori(campo, filtri[campo])
+        if valori == [TUTTI]:
+            valori = self.valori[campo]
+
+        risultato = {}
+        for valore in valori:
+            filtri[campo] = valore
+            cella = self.cella(**filtri)
+            if cella is not None:
+                risultato[valore] = cella
+        return risultato
+
+    def raggruppa(self, campo, elemento=TUTTI, piano=TUTTI, diametro=TUTTI):
+        """Somma per valore di un campo, rispettando i filtri sulle altre dimensioni"""
+        riepilogo = self.riepilogo(campo, elemento, piano, diametro)
+        return {valore: cella['somma'] for valore, cella in riepilogo.items()}
+
+    def conteggio_distinti(self, campo, elemento=TUTTI, piano=TUTTI, diametro=TUTTI):
+        """Numero di valori distinti di un campo presenti nella selezione"""
+        return len(self.riepilogo(campo, elemento, piano, diametro))
+
+    def gerarchia(self, elemento=TUTTI, piano=TUTTI, diametro=TUTTI, livelli=DIMENSIONI):
+        """Albero dei livelli indicati (Elemento → Piano → Diametro) con i subtotali di ogni nodo
+
+        Una sola passata sulle celle base selezionate, senza riscansionare i dati.
+        Ogni nodo è {'nome', 'somma', 'conteggio', 'figli': {valore: nodo}}; il risultato
+        resta in cache nel cubo e non va modificato.
+        """
+        selezioni = [tuple(self._valori(campo, selezione))
+                     for campo, selezione in zip(DIMENSIONI, (elemento, piano, diametro))]
+        chiave_cache = (tuple(selezioni), tuple(livelli))
+        with self._lock_gerarchie:
+            radice = self._gerarchie.get(chiave_cache)
+            if radice is not None:
+                self._gerarchie.move_to_end(chiave_cache)
+                return radice
+
+        filtri = {i: set(valori) for i, valori in enumerate(selezioni) if valori != (TUTTI,)}
+        posizioni = [DIMENSIONI.index(livello) for livello in livelli]
+
+        radice = {'nome': 'Totale', 'somma': 0.0, 'conteggio': 0, 'figli': {}}
+        for chiave in self.chiavi_base:
+            if any(chiave[i] not in valori for i, valori in filtri.items()):
+                continue
+            somma, conteggio = self.celle[chiave][:2]
+            nodo = radice
+            nodo['somma'] += somma
+            nodo['conteggio'] += conteggio
+            for i in posizioni:
+                figlio = nodo['figli'].get(chiave[i])
+                if figlio is None:
+                    figlio = nodo['figli'][chiave[i]] = {'nome': chiave[i], 'somma': 0.0, 'conteggio': 0, 'figli': {}}
+                figlio['somma'] += somma
+                figlio['conteggio'] += conteggio
+                nodo = figlio
+        with self._lock_gerarchie:
+            self._gerarchie[chiave_cache] = radice
+            while len(self._gerarchie) > GERARCHIE_IN_CACHE:
+                self._gerarchie.popitem(last=False)
+        return radice
+
+    def nodi_gerarchia(self, elemento=TUTTI, piano=TUTTI, diametro=TUTTI, livelli=DIMENSIONI):
+        """Nodi dell'albero in forma piatta (id, genitore, etichetta, livello, somma, conteggio), es. per un treemap"""
+        nodi = []
+
+        def visita(nodo, percorso, genitore, livello):
+            identificativo = '/'.join(str(p) for p in percorso) or 'Totale'
+            nodi.append({
+                'id': identificativo,
+                'genitore': genitore,
+                'etichetta': str(nodo['nome']),
+                'livello': livello,
+                'somma': nodo['somma'],
+                'conteggio': nodo['conteggio']
+            })
+            for valore, figlio in nodo['figli'].items():
+                visita(figlio, percorso + [valore], identificativo, livello + 1)
+
+        visita(self.gerarchia(elemento, piano, diametro, livelli), [], '', 0)
+        return nodi
@@ -1,11 +1,24 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import re
+import os
+import sys
+from array import array
 from datetime import datetime
 
+from aggregazioni_ferri import CuboFerri
+from cache_ferri import CacheDati
+from dataset_ferri import CaricatoreIncrementale, IndiceFerri, carica_dataset
+from osservatore_ferri import OsservatoreFile
+from parser_ferri import StatisticheParsing, e_file_storico
+from prestazioni_ferri import RegistroTempi, esporta_json
+
+# File dati predefinito; un altro file o un archivio .sqlite con: streamlit run app.py -- <file>
+DATA_FILE = sys.argv[1] if len(sys.argv) > 1 else 'data/output_ferri.txt'
+
+# Esecuzioni conservate nel pannello Prestazioni
+STORICO_PRESTAZIONI = 20
+
 # Configurazione pagina
 st.set_page_config(
     page_title="Visualizzatore Ferri Strutturali",
@@ -14,106 +27,298 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-def parse_ferri_data(file_path):
-    """Parser per leggere e strutturare i dati dal file di output"""
+def dataset_to_dataframe(dataset):
+    """Converte il dataset colonnare in DataFrame con colonne categoriche e tipi compatti"""
+    df = pd.DataFrame({
+        'Elemento': pd.Categorical.from_codes(np.asarray(dataset.cod_elemento), categories=dataset.elementi),
+        'Piano': pd.Categorical.from_codes(np.asarray(dataset.cod_piano), categories=dataset.piani),
+        'Diametro': np.array(dataset.diametro, dtype=np.uint8),
+        'Quantità': np.array(dataset.quantita, dtype=np.float64)
+    })
     
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+    # Colonne di provenienza per i dataset multi-progetto
+    if dataset.sorgenti:
+        codici = np.asarray(dataset.cod_sorgente)
+        df['Progetto'] = pd.Categorical([s['progetto'] for s in dataset.sorgenti])[codici]
+        df['File'] = pd.Categorical([s['file'] for s in dataset.sorgenti])[codici]
+        df['Data'] = pd.to_datetime([s['data'] for s in dataset.sorgenti])[codici]
     
-    data = []
-    current_element = None
-    
-    # Pattern per identificare le sezioni
-    element_pattern = r'={60}\n([A-Z]+)\n={60}'
+    return df
+
+def parse_ferri_data(file_path, caricatore=None, progetto=None):
+    """Parser per leggere e strutturare i dati dal file di output"""
     
-    # Trova tutte le sezioni
-    sections = re.split(element_pattern, content)
+    statistiche = StatisticheParsing()
+    if e_file_storico(file_path):
+        # Ultima esecuzione del progetto scelto nell'archivio
+        from storico_ferri import carica_storico
+        dataset = carica_storico(file_path, progetto)
+        caricatore = None
+    elif caricatore is None:
+        dataset = carica_dataset(file_path, statistiche)
+    else:
+        # Riparsa solo le sezioni cambiate dall'ultimo caricamento
+        dataset = caricatore.carica(file_path, statistiche)
     
-    for i in range(1, len(sections), 2):
-        element_type = sections[i].strip()
-        element_content = sections[i+1] if i+1 < len(sections) else ""
-        
-        if element_type in ['PILASTRI', 'TRAVI', 'PARETI', 'FONDAZIONE']:
-            # Parse delle righe di dati
-            lines = element_content.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                # Skip linee vuote e separatori
-                if not line or line.startswith('-') or '=' in line:
-                    continue
-                
-                # Pattern per estrarre piano, diametro e quantità
-                match = re.match(r'(.+?)\s+ø\s*(\d+)\s+([\d.]+)', line)
-                if match:
-                    piano = match.group(1).strip()
-                    diametro = int(match.group(2))
-                    quantita = float(match.group(3))
-                    
-                    data.append({
-                        'Elemento': element_type,
-                        'Piano': piano,
-                        'Diametro': diametro,
-                        'Quantità': quantita
-                    })
-    
-    return pd.DataFrame(data)
-
-def load_data():
-    """Carica i dati dal file"""
+    df = dataset_to_dataframe(dataset)
+    df.attrs['parsing'] = statistiche.as_dict()
+    if caricatore is not None:
+        df.attrs['parsing']['sezioni'] = caricatore.ultimo_caricamento['blocchi']
+        df.attrs['parsing']['sezioni_riparsate'] = caricatore.ultimo_caricamento['riparsati']
+        df.attrs['parsing']['sidecar'] = caricatore.ultimo_caricamento.get('sidecar', False)
+    return df
+
+@st.cache_resource
+def get_data_cache(progetto=None):
+    """Cache dei dati condivisa tra tutte le sessioni del server (una per progetto dell'archivio)"""
+    return CacheDati()
+
+@st.cache_resource
+def get_incremental_loader(file_path):
+    """Caricatore incrementale condiviso per un singolo file"""
+    return CaricatoreIncrementale()
+
+def load_data(file_path=DATA_FILE, progetto=None):
+    """Carica i dati dal file (riletto solo se mtime o contenuto cambiano)"""
     try:
-        df = parse_ferri_data('data/output_ferri.txt')
-        return df
+        caricatore = get_incremental_loader(os.path.abspath(file_path))
+        return get_data_cache(progetto).carica(file_path, lambda path: parse_ferri_data(path, caricatore, progetto))
     except Exception as e:
         st.error(f"Errore nel caricamento del file: {e}")
         return pd.DataFrame()
 
+def build_cube(df):
+    """Cubo di aggregazione Elemento × Piano × Diametro a partire dal DataFrame"""
+    quantita = df['Quantità']
+    celle = quantita.groupby([df['Elemento'], df['Piano'], df['Diametro']], observed=True).agg(
+        ['sum', 'count', 'min', 'max', 'var']
+    )
+    # Momento secondo di ogni cella, unibile tra celle nei rollup del cubo
+    m2 = (celle['var'] * (celle['count'] - 1)).fillna(0.0)
+    return CuboFerri.da_celle(
+        (elemento, piano, int(diametro), float(somma), int(conteggio), float(minimo), float(massimo), float(m))
+        for (elemento, piano, diametro), somma, conteggio, minimo, massimo, m
+        in zip(celle.index, celle['sum'], celle['count'], celle['min'], celle['max'], m2)
+    )
+
+@st.cache_resource
+def get_cube_cache(progetto=None):
+    """Cache dei cubi di aggregazione condivisa tra le sessioni (una per progetto dell'archivio)"""
+    return CacheDati()
+
+def build_cube_storico(file_path, progetto=None):
+    """Cubo dell'ultima esecuzione di un progetto dell'archivio, con le celle aggregate direttamente in SQL"""
+    from storico_ferri import StoricoFerri
+    with StoricoFerri(file_path) as storico:
+        esecuzione = storico.ultima_esecuzione(storico.scegli_progetto(progetto))
+        return CuboFerri.da_celle(storico.celle_cubo(esecuzione=esecuzione))
+
+def load_cube(file_path=DATA_FILE, progetto=None):
+    """Cubo del file, ricalcolato solo quando cambia il file"""
+    if e_file_storico(file_path):
+        return get_cube_cache(progetto).carica(file_path, lambda path: build_cube_storico(path, progetto))
+    return get_cube_cache().carica(file_path, lambda path: build_cube(load_data(path)))
+
+def build_index(df):
+    """Indici posizionali per Elemento, Piano e Diametro a partire dal DataFrame"""
+    def colonna(valori, typecode):
+        codici = array(typecode)
+        codici.frombytes(valori.astype(np.dtype(typecode)).tobytes())
+        return codici
+    
+    return IndiceFerri(
+        colonna(df['Elemento'].cat.codes.to_numpy(), 'B'),
+        colonna(df['Piano'].cat.codes.to_numpy(), 'H'),
+        colonna(df['Diametro'].to_numpy(), 'B'),
+        df['Elemento'].cat.categories.tolist(),
+        df['Piano'].cat.categories.tolist()
+    )
+
+@st.cache_resource
+def get_index_cache(progetto=None):
+    """Cache degli indici posizionali condivisa tra le sessioni (una per progetto dell'archivio)"""
+    return CacheDati()
+
+def load_index(file_path=DATA_FILE, progetto=None):
+    """Indici del file, ricostruiti solo quando cambia il file"""
+    return get_index_cache(progetto).carica(file_path, lambda path: build_index(load_data(path, progetto)))
+
+def select_project(file_path=DATA_FILE):
+    """Progetto da mostrare quando la sorgente è un archivio storico (None per i file di testo)"""
+    if not e_file_storico(file_path):
+        return None
+    from storico_ferri import StoricoFerri
+    with StoricoFerri(file_path) as storico:
+        progetti = storico.progetti()
+    if not progetti:
+        return None
+    return st.sidebar.selectbox("Progetto:", progetti)
+
+def plotly_express():
+    """Importa plotly.express solo quando serve disegnare un grafico"""
+    import plotly.express as px
+    return px
+
+def cube_group(cubo, campo, colonna, filtri):
+    """Somme per valore di un campo lette dal cubo, come DataFrame per i grafici"""
+    return pd.DataFrame(list(cubo.raggruppa(campo, **filtri).items()), columns=[colonna, 'Quantità'])
+
+def live_session(session_id):
+    """Sessione attiva (None se chiusa) tramite le API interne del runtime di Streamlit
+
+    Non fanno parte dell'API pubblica: con una versione di Streamlit diversa da quelle
+    di requirements.txt possono sollevare qualsiasi eccezione.
+    """
+    from streamlit import runtime
+    info = runtime.get_instance()._session_mgr.get_active_session_info(session_id)
+    return None if info is None else info.session
+
+def live_api_error(session_id):
+    """None se le API interne usate dalla modalità live funzionano, altrimenti l'errore come testo"""
+    try:
+        sessione = live_session(session_id)
+        if sessione is not None:
+            # Gli stessi attributi che usa rerun_live_sessions
+            sessione.request_rerun, sessione._client_state
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def rerun_live_sessions(sessioni):
+    """Chiede il rerun delle sessioni live ancora connesse, come fa Streamlit con 'Run on save'"""
+    for session_id in list(sessioni):
+        try:
+            sessione = live_session(session_id)
+            if sessione is None:
+                # Sessione chiusa
+                sessioni.discard(session_id)
+            else:
+                sessione.request_rerun(sessione._client_state)
+        except Exception as e:
+            # API interne cambiate: la modalità live si spegne, l'app continua a funzionare
+            print(f"⚠️ Modalità live disattivata: {type(e).__name__}: {e}", file=sys.stderr)
+            sessioni.clear()
+            return
+
+@st.cache_resource
+def get_file_watcher(file_path):
+    """Un solo osservatore del file dati per tutto il server, con le sessioni in modalità live"""
+    sessioni = set()
+    osservatore = OsservatoreFile(file_path, lambda path: rerun_live_sessions(sessioni)).avvia()
+    return osservatore, sessioni
+
+def live_mode(file_path=DATA_FILE):
+    """Modalità live opzionale: la sessione si aggiorna da sola quando il file dati cambia"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    errore = live_api_error(ctx.session_id) if ctx is not None else None
+    attiva = st.sidebar.checkbox(
+        "🔴 Live",
+        key="modalita_live",
+        help="Aggiorna la dashboard appena il file dati viene riscritto",
+        disabled=errore is not None
+    )
+    if ctx is None:
+        return
+    if errore is not None:
+        st.sidebar.warning(f"Modalità live non disponibile con questa versione di Streamlit ({errore}): "
+                           "aggiorna la pagina per vedere le modifiche al file.")
+        attiva = False
+    
+    if attiva:
+        # Il file viene riparsato una volta sola (CacheDati) al primo rerun, le altre sessioni lo riusano
+        osservatore, sessioni = get_file_watcher(os.path.abspath(file_path))
+        sessioni.add(ctx.session_id)
+        st.session_state['live_iscritta'] = True
+        if osservatore.ultimo_cambio:
+            st.sidebar.caption(f"File aggiornato alle {osservatore.ultimo_cambio:%H:%M:%S}")
+    elif st.session_state.pop('live_iscritta', False):
+        get_file_watcher(os.path.abspath(file_path))[1].discard(ctx.session_id)
+
+def show_performance(registro):
+    """Pannello Prestazioni nella sidebar, con le ultime esecuzioni esportabili in JSON"""
+    storico = st.session_state.setdefault('prestazioni', [])
+    storico.append(registro)
+    del storico[:-STORICO_PRESTAZIONI]
+    
+    if not st.sidebar.checkbox("⏱️ Prestazioni", key="mostra_prestazioni"):
+        return
+    
+    with st.sidebar.expander("⏱️ Prestazioni", expanded=True):
+        st.metric("Esecuzione", f"{registro.totale_ms:.1f} ms")
+        st.dataframe(
+            pd.DataFrame(
+                [(' ' * i['livello'] + i['nome'], round(i['ms'], 2)) for i in registro.intervalli],
+                columns=['Passo', 'ms']
+            ),
+            hide_index=True,
+            use_container_width=True
+        )
+        st.download_button(
+            "Esporta JSON",
+            data=esporta_json(storico),
+            file_name="prestazioni_ferri.json",
+            mime="application/json"
+        )
+
 def main():
+    # Tempi dei singoli passi: sempre raccolti, mostrati solo su richiesta
+    registro = RegistroTempi('app.main')
+    
     st.title("🏗️ Visualizzatore Ferri Strutturali")
     st.markdown("---")
     
+    live_mode()
+    
+    # Progetto dell'archivio storico (scelto nella sidebar)
+    progetto = select_project()
+    
     # Caricamento dati
-    df = load_data()
+    with registro.misura('load_data'):
+        df = load_data(progetto=progetto)
     
     if df.empty:
         st.error("Nessun dato disponibile. Verificare che il file 'output_ferri.txt' sia presente.")
         return
     
+    # Cubo e indici: ricostruiti solo quando cambia il file
+    with registro.misura('load_cube'):
+        cubo = load_cube(progetto=progetto)
+    
     # Sidebar con filtri
     st.sidebar.header("🔍 Filtri")
     
-    # Filtro per elemento strutturale
-    elementi_disponibili = ['Tutti'] + sorted(df['Elemento'].unique().tolist())
-    elemento_selezionato = st.sidebar.selectbox(
+    # Filtri a selezione multipla: nessuna voce selezionata equivale a "Tutti"
+    elementi_selezionati = st.sidebar.multiselect(
         "Elemento Strutturale:",
-        elementi_disponibili
+        cubo.valori['elemento'],
+        placeholder="Tutti"
     )
     
-    # Filtro per piano
-    piani_disponibili = ['Tutti'] + sorted(df['Piano'].unique().tolist())
-    piano_selezionato = st.sidebar.selectbox(
+    piani_selezionati = st.sidebar.multiselect(
         "Piano:",
-        piani_disponibili
+        cubo.valori['piano'],
+        placeholder="Tutti"
     )
     
-    # Filtro per diametro
-    diametri_disponibili = ['Tutti'] + sorted(df['Diametro'].unique().tolist())
-    diametro_selezionato = st.sidebar.selectbox(
+    diametri_selezionati = st.sidebar.multiselect(
         "Diametro (mm):",
-        diametri_disponibili
+        cubo.valori['diametro'],
+        placeholder="Tutti"
     )
     
-    # Applica filtri
-    df_filtered = df.copy()
-    
-    if elemento_selezionato != 'Tutti':
-        df_filtered = df_filtered[df_filtered['Elemento'] == elemento_selezionato]
-    
-    if piano_selezionato != 'Tutti':
-        df_filtered = df_filtered[df_filtered['Piano'] == piano_selezionato]
-    
-    if diametro_selezionato != 'Tutti':
-        df_filtered = df_filtered[df_filtered['Diametro'] == diametro_selezionato]
+    # Selezione come chiave del cubo e dell'indice (None = Tutti)
+    filtri = {
+        'elemento': elementi_selezionati or None,
+        'piano': piani_selezionati or None,
+        'diametro': diametri_selezionati or None
+    }
+    with registro.misura('filtri'):
+        selezione = cubo.cella(**filtri)
+        
+        # Righe selezionate tramite gli indici posizionali
+        righe = load_index(progetto=progetto).filtra(**filtri)
+        df_filtered = df if isinstance(righe, range) else df.iloc[np.asarray(righe, dtype=np.int64)]
     
     # Layout principale con colonne
     col1, col2 = st.columns([2, 1])
@@ -123,127 +328,178 @@ def main():
         
         # Mostra tabella filtrata
         if not df_filtered.empty:
-            # Aggiungi colonna con unità di misura
-            df_display = df_filtered.copy()
-            df_display['Diametro (mm)'] = df_display['Diametro'].astype(str) + ' mm'
-            df_display['Quantità (kg)'] = df_display['Quantità'].round(2).astype(str) + ' kg'
-            
-            st.dataframe(
-                df_display[['Elemento', 'Piano', 'Diametro (mm)', 'Quantità (kg)']],
-                use_container_width=True,
-                hide_index=True
-            )
+            with registro.misura('st.dataframe'):
+                # Aggiungi colonna con unità di misura
+                df_display = df_filtered.copy()
+                df_display['Diametro (mm)'] = df_display['Diametro'].astype(str) + ' mm'
+                df_display['Quantità (kg)'] = df_display['Quantità'].round(2).astype(str) + ' kg'
+                
+                st.dataframe(
+                    df_display[['Elemento', 'Piano', 'Diametro (mm)', 'Quantità (kg)']],
+                    use_container_width=True,
+                    hide_index=True
+                )
         else:
             st.warning("Nessun dato corrisponde ai filtri selezionati.")
     
     with col2:
         st.subheader("📈 Statistiche")
         
-        if not df_filtered.empty:
-            # Statistiche principali
-            total_weight = df_filtered['Quantità'].sum()
-            avg_weight = df_filtered['Quantità'].mean()
-            max_weight = df_filtered['Quantità'].max()
-            min_weight = df_filtered['Quantità'].min()
+        if selezione is not None:
+            # Statistiche principali, lette dal cubo
+            total_weight = selezione['somma']
+            avg_weight = selezione['media']
+            max_weight = selezione['massimo']
+            min_weight = selezione['minimo']
             
             st.metric("Peso Totale", f"{total_weight:.2f} kg")
             st.metric("Peso Medio", f"{avg_weight:.2f} kg")
             st.metric("Peso Massimo", f"{max_weight:.2f} kg")
             st.metric("Peso Minimo", f"{min_weight:.2f} kg")
+            st.metric("Deviazione Standard", f"{selezione['deviazione_standard']:.2f} kg")
             
             # Conteggi
             st.markdown("**Conteggi:**")
-            st.write(f"- Elementi: {df_filtered['Elemento'].nunique()}")
-            st.write(f"- Piani: {df_filtered['Piano'].nunique()}")
-            st.write(f"- Diametri: {df_filtered['Diametro'].nunique()}")
-            st.write(f"- Righe totali: {len(df_filtered)}")
+            st.write(f"- Elementi: {cubo.conteggio_distinti('elemento', **filtri)}")
+            st.write(f"- Piani: {cubo.conteggio_distinti('piano', **filtri)}")
+            st.write(f"- Diametri: {cubo.conteggio_distinti('diametro', **filtri)}")
+            st.write(f"- Righe totali: {selezione['conteggio']}")
     
     # Sezione grafici
     st.markdown("---")
     st.subheader("📊 Visualizzazioni")
     
-    if not df_filtered.empty:
-        # Crea tabs per diversi tipi di visualizzazione
-        tab1, tab2, tab3, tab4 = st.tabs(["Per Elemento", "Per Piano", "Per Diametro", "Distribuzione"])
+    if selezione is not None:
+        # Solo la vista selezionata viene calcolata e disegnata
+        vista = st.radio(
+            "Vista:",
+            ["Per Elemento", "Per Piano", "Per Diametro", "Distribuzione", "Gerarchia"],
+            horizontal=True,
+            label_visibility="collapsed",
+            key="vista_grafici"
+        )
+        with registro.misura('import plotly'):
+            px = plotly_express()
         
-        with tab1:
+        if vista == "Per Elemento":
             # Grafico per elemento
-            element_data = df_filtered.groupby('Elemento')['Quantità'].sum().reset_index()
-            fig1 = px.bar(
-                element_data, 
-                x='Elemento', 
-                y='Quantità',
-                title='Distribuzione Peso per Elemento Strutturale',
-                color='Quantità',
-                color_continuous_scale='viridis'
-            )
-            fig1.update_layout(showlegend=False)
-            st.plotly_chart(fig1, use_container_width=True)
+            with registro.misura('groupby elemento'):
+                element_data = cube_group(cubo, 'elemento', 'Elemento', filtri)
+            with registro.misura('grafico elemento'):
+                fig = px.bar(
+                    element_data, 
+                    x='Elemento', 
+                    y='Quantità',
+                    title='Distribuzione Peso per Elemento Strutturale',
+                    color='Quantità',
+                    color_continuous_scale='viridis'
+                )
+                fig.update_layout(showlegend=False)
         
-        with tab2:
+        elif vista == "Per Piano":
             # Grafico per piano
-            piano_data = df_filtered.groupby('Piano')['Quantità'].sum().reset_index()
-            fig2 = px.bar(
-                piano_data, 
-                x='Piano', 
-                y='Quantità',
-                title='Distribuzione Peso per Piano',
-                color='Quantità',
-                color_continuous_scale='plasma'
-            )
-            fig2.update_layout(showlegend=False)
-            st.plotly_chart(fig2, use_container_width=True)
+            with registro.misura('groupby piano'):
+                piano_data = cube_group(cubo, 'piano', 'Piano', filtri)
+            with registro.misura('grafico piano'):
+                fig = px.bar(
+                    piano_data, 
+                    x='Piano', 
+                    y='Quantità',
+                    title='Distribuzione Peso per Piano',
+                    color='Quantità',
+                    color_continuous_scale='plasma'
+                )
+                fig.update_layout(showlegend=False)
         
-        with tab3:
+        elif vista == "Per Diametro":
             # Grafico per diametro
-            diameter_data = df_filtered.groupby('Diametro')['Quantità'].sum().reset_index()
-            fig3 = px.bar(
-                diameter_data, 
-                x='Diametro', 
-                y='Quantità',
-                title='Distribuzione Peso per Diametro',
-                color='Quantità',
-                color_continuous_scale='cividis'
-            )
-            fig3.update_layout(showlegend=False)
-            fig3.update_xaxis(title='Diametro (mm)')
-            st.plotly_chart(fig3, use_container_width=True)
+            with registro.misura('groupby diametro'):
+                diameter_data = cube_group(cubo, 'diametro', 'Diametro', filtri)
+            with registro.misura('grafico diametro'):
+                fig = px.bar(
+                    diameter_data, 
+                    x='Diametro', 
+                    y='Quantità',
+                    title='Distribuzione Peso per Diametro',
+                    color='Quantità',
+                    color_continuous_scale='cividis'
+                )
+                fig.update_layout(showlegend=False)
+                fig.update_xaxes(title='Diametro (mm)')
+        
+        elif vista == "Gerarchia":
+            # Treemap Elemento → Piano → Diametro dai subtotali del cubo (cliccando si scende di livello)
+            with registro.misura('gerarchia'):
+                nodi = pd.DataFrame(cubo.nodi_gerarchia(**filtri))
+            with registro.misura('grafico gerarchia'):
+                fig = px.treemap(
+                    nodi,
+                    ids='id',
+                    parents='genitore',
+                    names='etichetta',
+                    values='somma',
+                    branchvalues='total',
+                    title='Peso per Elemento, Piano e Diametro'
+                )
+                fig.update_traces(hovertemplate='%{label}<br>%{value:,.2f} kg<extra></extra>')
         
-        with tab4:
+        else:
             # Grafico a torta per distribuzione elementi
-            element_pie_data = df_filtered.groupby('Elemento')['Quantità'].sum().reset_index()
-            fig4 = px.pie(
-                element_pie_data, 
-                values='Quantità', 
-                names='Elemento',
-                title='Distribuzione Percentuale per Elemento'
-            )
-            st.plotly_chart(fig4, use_container_width=True)
+            with registro.misura('groupby elemento'):
+                element_pie_data = cube_group(cubo, 'elemento', 'Elemento', filtri)
+            with registro.misura('grafico distribuzione'):
+                fig = px.pie(
+                    element_pie_data, 
+                    values='Quantità', 
+                    names='Elemento',
+                    title='Distribuzione Percentuale per Elemento'
+                )
+        
+        with registro.misura('st.plotly_chart'):
+            st.plotly_chart(fig, use_container_width=True)
     
     # Sezione analisi avanzata
     st.markdown("---")
     st.subheader("🔬 Analisi Avanzata")
     
-    if not df_filtered.empty:
+    if selezione is not None:
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Top 5 Combinazioni per Peso:**")
-            top_combinations = df_filtered.nlargest(5, 'Quantità')[['Elemento', 'Piano', 'Diametro', 'Quantità']]
+            with registro.misura('top 5'):
+                top_combinations = df_filtered.nlargest(5, 'Quantità')[['Elemento', 'Piano', 'Diametro', 'Quantità']]
             st.dataframe(top_combinations, hide_index=True)
         
         with col2:
             st.write("**Riepilogo per Diametro:**")
-            diameter_summary = df_filtered.groupby('Diametro').agg({
-                'Quantità': ['sum', 'count', 'mean']
-            }).round(2)
-            diameter_summary.columns = ['Peso Totale', 'Conteggio', 'Peso Medio']
+            with registro.misura('riepilogo diametro'):
+                riepilogo = cubo.riepilogo('diametro', **filtri)
+            diameter_summary = pd.DataFrame(
+                [(c['somma'], c['conteggio'], c['media']) for c in riepilogo.values()],
+                index=pd.Index(list(riepilogo), name='Diametro'),
+                columns=['Peso Totale', 'Conteggio', 'Peso Medio']
+            ).round(2)
             st.dataframe(diameter_summary)
     
     # Footer con informazioni sul file
     st.markdown("---")
-    st.markdown("**Fonte dati:** output_ferri.txt")
+    st.markdown(f"**Fonte dati:** {os.path.basename(DATA_FILE)}")
+    parsing = df.attrs.get('parsing')
+    if e_file_storico(DATA_FILE):
+        st.markdown(f"**Parsing:** ultima esecuzione di '{progetto}' letta dall'archivio storico")
+    elif parsing and parsing.get('sidecar'):
+        st.markdown("**Parsing:** dati letti dal sidecar binario (file invariato)")
+    elif parsing:
+        st.markdown(
+            f"**Parsing:** {parsing['righe']} righe in {parsing['secondi'] * 1000:.1f} ms "
+            f"({parsing['righe_al_secondo']:,.0f} righe/s)"
+        )
+        if 'sezioni' in parsing:
+            st.markdown(f"**Sezioni riparsate:** {parsing['sezioni_riparsate']} su {parsing['sezioni']}")
     st.markdown(f"**Ultimo aggiornamento:** {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    
+    show_performance(registro.chiudi())
 
 if __name__ == "__main__":
     main()
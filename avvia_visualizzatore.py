@@ -1,81 +1,155 @@
 """
 Script per avviare il Visualizzatore Ferri Strutturali con Streamlit
 """
+import importlib.util
 import subprocess
+import threading
+import urllib.error
+import urllib.request
 import webbrowser
 import time
 import sys
 import os
 
+from dataset_ferri import CaricatoreIncrementale
+from parser_ferri import StatisticheParsing
+
+DATA_FILE = 'data/output_ferri.txt'
+PORTA = 8501
+URL_APP = f'http://localhost:{PORTA}'
+
+# Endpoint di stato del server Streamlit: risponde "ok" quando l'app è pronta
+URL_HEALTH = f'{URL_APP}/_stcore/health'
+
+# Attesa massima dell'avvio e intervallo tra due controlli (secondi)
+TIMEOUT_AVVIO = 60.0
+INTERVALLO_HEALTH = 0.1
+
+def comando_streamlit():
+    """Comando per avviare Streamlit con l'interprete corrente, oppure None se non installato"""
+    if importlib.util.find_spec('streamlit') is None:
+        return None
+    return [sys.executable, "-m", "streamlit", "run", "app.py",
+            "--server.port", str(PORTA),
+            "--server.headless", "true"]
+
+def preriscalda_dati():
+    """Primo caricamento dei dati: crea il sidecar binario che l'app leggerà all'avvio
+
+    Passa dallo stesso CaricatoreIncrementale di app.py, così il sidecar contiene
+    anche i blocchi di sezione e la prima modifica al file riparsa solo quelli cambiati.
+
+    Gira in background e non ritarda l'apertura del browser. Una GET della pagina
+    non servirebbe: Streamlit esegue app.py solo quando una sessione si collega
+    via websocket, quindi la cache del server si scalda con la prima sessione vera.
+    """
+    inizio = time.perf_counter()
+    try:
+        statistiche = StatisticheParsing()
+        dataset = CaricatoreIncrementale().carica(DATA_FILE, statistiche)
+    except Exception as e:
+        print(f"⚠️ Preriscaldamento dati non riuscito: {type(e).__name__}: {e}")
+        return
+    origine = "parsing" if statistiche.righe > 0 else "sidecar"
+    print(f"🔥 Dati pronti: {len(dataset)} record da {origine} in {(time.perf_counter() - inizio) * 1000:.0f} ms")
+
+def attendi_server(process, timeout=TIMEOUT_AVVIO):
+    """Interroga l'endpoint di health finché il server è pronto; False se non parte"""
+    scadenza = time.perf_counter() + timeout
+    while time.perf_counter() < scadenza:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(URL_HEALTH, timeout=1) as risposta:
+                if risposta.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(INTERVALLO_HEALTH)
+    return False
+
+def inoltra_output(process):
+    """Mostra l'output di Streamlit mentre il launcher attende"""
+    for output in process.stdout:
+        print(output.rstrip())
+
 def avvia_streamlit():
     print("🏗️ VISUALIZZATORE FERRI STRUTTURALI")
     print("=" * 50)
     print()
     print("Avvio dell'applicazione Streamlit...")
     print()
-    
+
     # Verifica che il file app.py esista
     if not os.path.exists('app.py'):
         print("❌ Errore: File 'app.py' non trovato!")
         input("Premi Enter per uscire...")
         return
-    
+
     # Verifica che il file dati esista
-    if not os.path.exists('data/output_ferri.txt'):
+    if not os.path.exists(DATA_FILE):
         print("❌ Errore: File 'output_ferri.txt' non trovato!")
         input("Premi Enter per uscire...")
         return
-    
+
+    process = None
     try:
         print("🚀 Avvio Streamlit...")
-        print("📍 L'applicazione sarà disponibile su: http://localhost:8501")
+        print(f"📍 L'applicazione sarà disponibile su: {URL_APP}")
         print("⏹️  Per fermare l'app: Ctrl+C nel terminale")
         print()
-        
-        # Avvia Streamlit
-        python_path = r"C:\Users\Utente\AppData\Local\Programs\Python\Python313\Scripts\streamlit.exe"
-        
-        if not os.path.exists(python_path):
-            print("❌ Errore: Streamlit non trovato nel percorso specificato!")
-            print(f"   Percorso: {python_path}")
+
+        # Streamlit dell'interprete corrente, senza percorsi fissi
+        cmd = comando_streamlit()
+        if cmd is None:
+            print("❌ Errore: Streamlit non è installato per questo interprete Python!")
+            print(f"   Installa con: {sys.executable} -m pip install -r requirements.txt")
             input("Premi Enter per uscire...")
             return
-        
-        # Comando per avviare streamlit
-        cmd = [python_path, "run", "app.py", "--server.port", "8501"]
-        
+
         print("⚡ Comando:", " ".join(cmd))
         print()
-        
+
+        inizio = time.perf_counter()
+
         # Avvia il processo
-        process = subprocess.Popen(cmd, 
-                                 stdout=subprocess.PIPE, 
-                                 stderr=subprocess.STDOUT, 
+        process = subprocess.Popen(cmd,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT,
                                  universal_newlines=True,
                                  bufsize=1)
-        
-        # Aspetta un po' e poi apri il browser
-        time.sleep(3)
-        webbrowser.open('http://localhost:8501')
-        
+        threading.Thread(target=inoltra_output, args=(process,), daemon=True).start()
+
+        # Mentre il server parte, il primo caricamento dei dati prepara il sidecar
+        threading.Thread(target=preriscalda_dati, daemon=True).start()
+
+        # Il browser si apre appena il server risponde, senza aspettare il preriscaldamento
+        pronto = attendi_server(process)
+        avvio = time.perf_counter() - inizio
+
+        if not pronto:
+            print(f"❌ Il server non ha risposto entro {TIMEOUT_AVVIO:.0f} s")
+            process.terminate()
+            input("\nPremi Enter per uscire...")
+            return
+
+        print(f"⏱️  Server pronto in {avvio:.2f} s")
+        webbrowser.open(URL_APP)
+
         print("🌐 Browser aperto automaticamente!")
-        print("💡 Se non si apre, vai manualmente su: http://localhost:8501")
+        print(f"💡 Se non si apre, vai manualmente su: {URL_APP}")
         print()
-        
-        # Mostra l'output di Streamlit
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                print(output.strip())
-                
+
+        # L'output di Streamlit continua a essere mostrato fino all'arresto
+        process.wait()
+
     except KeyboardInterrupt:
         print("\n⏹️ Applicazione fermata dall'utente.")
-        process.terminate()
+        if process is not None:
+            process.terminate()
     except Exception as e:
         print(f"❌ Errore nell'avvio: {e}")
-    
+
     input("\nPremi Enter per uscire...")
 
 if __name__ == "__main__":
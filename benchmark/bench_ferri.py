@@ -0,0 +1,211 @@
+"""
+Benchmark di parsing, filtri, aggregazioni e report su dati sintetici
+Per ogni dimensione genera un file output_ferri.txt e misura tempo (minimo e
+mediana su più ripetizioni) e picco di memoria (tracemalloc, in una esecuzione
+separata) di ogni passo. I risultati vengono salvati in JSON e possono essere
+confrontati con un'esecuzione precedente.
+
+Uso:
+    python benchmark/bench_ferri.py [--righe 1000 100000 ...] [--ripetizioni 3] [--output FILE] [--confronta FILE]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+CARTELLA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARTELLA_REPO)
+
+from dataset_ferri import percorso_sidecar
+from genera_dati import genera_file
+import visualizzatore_semplice
+
+# Dimensioni predefinite (righe dati); fino a 10**7 con --righe
+RIGHE_PREDEFINITE = (10 ** 3, 10 ** 4, 10 ** 5)
+
+# Cartella dei risultati salvati
+CARTELLA_RISULTATI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risultati')
+
+# Filtro usato nei casi "filtrati"
+FILTRO = {'elemento': 'TRAVI', 'diametro': 16}
+
+
+def misura(funzione, ripetizioni=3, preparazione=None):
+    """Tempo minimo e mediano su più ripetizioni, più il picco di memoria di un'esecuzione tracciata"""
+    tempi = []
+    for _ in range(ripetizioni):
+        if preparazione:
+            preparazione()
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append(time.perf_counter() - inizio)
+
+    # Esecuzione separata: tracemalloc rallenta e falserebbe i tempi
+    if preparazione:
+        preparazione()
+    tracemalloc.start()
+    try:
+        funzione()
+        picco = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'secondi': min(tempi),
+        'secondi_mediana': statistics.median(tempi),
+        'picco_memoria_byte': picco
+    }
+
+
+def importa_app():
+    """Importa app.py se le sue dipendenze sono installate, altrimenti None"""
+    try:
+        import app
+        return app
+    except ImportError as e:
+        print(f"⚠️ app.py non importabile, casi saltati: {e}", file=sys.stderr)
+        return None
+
+
+def casi_benchmark(file_path, app=None):
+    """Casi da misurare su un file: nome -> (funzione, preparazione)"""
+
+    def senza_sidecar():
+        if os.path.exists(percorso_sidecar(file_path)):
+            os.remove(percorso_sidecar(file_path))
+
+    dati = visualizzatore_semplice.parse_ferri_data(file_path)
+    casi = {
+        'parse_ferri_data[visualizzatore]': (lambda: visualizzatore_semplice.parse_ferri_data(file_path), senza_sidecar),
+        'parse_ferri_data[visualizzatore,sidecar]': (lambda: visualizzatore_semplice.parse_ferri_data(file_path), None),
+        'calculate_statistics': (lambda: visualizzatore_semplice.calculate_statistics(dati), None),
+        'calculate_statistics[filtrato]': (lambda: visualizzatore_semplice.calculate_statistics(dati, FILTRO), None),
+        'group_by_field': (lambda: [visualizzatore_semplice.group_by_field(dati, campo)
+                                    for campo in ('elemento', 'piano', 'diametro')], None),
+        'generate_html_report': (lambda: visualizzatore_semplice.scrivi_report(dati, io.StringIO()), None),
+    }
+
+    if app is not None:
+        df = app.parse_ferri_data(file_path)
+        cubo = app.build_cube(df)
+        indice = app.build_index(df)
+        filtri = {'elemento': [FILTRO['elemento']], 'piano': None, 'diametro': [FILTRO['diametro']]}
+
+        def filtra_e_raggruppa():
+            righe = indice.filtra(**filtri)
+            selezione = df if isinstance(righe, range) else df.iloc[list(righe)]
+            gruppi = [app.cube_group(cubo, campo, colonna, filtri)
+                      for campo, colonna in (('elemento', 'Elemento'), ('piano', 'Piano'), ('diametro', 'Diametro'))]
+            return selezione, cubo.cella(**filtri), gruppi
+
+        casi.update({
+            'parse_ferri_data[app]': (lambda: app.parse_ferri_data(file_path), senza_sidecar),
+            'build_cube[app]': (lambda: app.build_cube(df), None),
+            'build_index[app]': (lambda: app.build_index(df), None),
+            'filtra_e_raggruppa[app]': (filtra_e_raggruppa, None),
+        })
+    return casi
+
+
+def esegui(righe_elenco=RIGHE_PREDEFINITE, ripetizioni=3, piani=50, cartella=None, progresso=True):
+    """Esegue il benchmark per ogni dimensione e restituisce i risultati"""
+    app = importa_app()
+    risultati = []
+
+    with tempfile.TemporaryDirectory(dir=cartella) as temporanea:
+        for righe in righe_elenco:
+            file_path = os.path.join(temporanea, f'output_ferri_{righe}.txt')
+            inizio = time.perf_counter()
+            genera_file(file_path, righe, piani)
+            if progresso:
+                print(f"📄 {righe} righe: file di {os.path.getsize(file_path) / 1e6:.1f} MB "
+                      f"generato in {time.perf_counter() - inizio:.1f} s", file=sys.stderr)
+
+            for nome, (funzione, preparazione) in casi_benchmark(file_path, app).items():
+                # Le dimensioni grandi vengono misurate una volta sola
+                esito = misura(funzione, ripetizioni if righe <= 10 ** 6 else 1, preparazione)
+                esito.update({'caso': nome, 'righe': righe,
+                              'righe_al_secondo': righe / esito['secondi'] if esito['secondi'] > 0 else 0.0})
+                risultati.append(esito)
+                if progresso:
+                    print(f"   {nome:<42} {esito['secondi'] * 1000:>10.1f} ms "
+                          f"{esito['picco_memoria_byte'] / 2 ** 20:>8.1f} MiB", file=sys.stderr)
+
+    return risultati
+
+
+def versione_codice():
+    """Commit git corrente, se disponibile"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=CARTELLA_REPO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def confronta(risultati, precedente):
+    """Rapporto tra i tempi attuali e quelli di un'esecuzione precedente, per caso e dimensione"""
+    prima = {(r['caso'], r['righe']): r for r in precedente['risultati']}
+    confronto = []
+    for r in risultati:
+        vecchio = prima.get((r['caso'], r['righe']))
+        if vecchio and vecchio['secondi'] > 0:
+            confronto.append({
+                'caso': r['caso'],
+                'righe': r['righe'],
+                'rapporto_tempo': r['secondi'] / vecchio['secondi'],
+                'rapporto_memoria': (r['picco_memoria_byte'] / vecchio['picco_memoria_byte']
+                                     if vecchio['picco_memoria_byte'] else None)
+            })
+    return confronto
+
+
+def main(argv=None):
+    """Benchmark da riga di comando con risultati salvati in JSON"""
+    parser = argparse.ArgumentParser(description="Benchmark su dati sintetici output_ferri")
+    parser.add_argument('--righe', type=int, nargs='+', default=list(RIGHE_PREDEFINITE),
+                        help="Dimensioni da misurare (righe dati)")
+    parser.add_argument('--ripetizioni', type=int, default=3, help="Ripetizioni per ogni caso")
+    parser.add_argument('--piani', type=int, default=50, help="Numero di piani distinti")
+    parser.add_argument('--output', default=None, help="File JSON dei risultati")
+    parser.add_argument('--confronta', default=None, help="JSON di un'esecuzione precedente")
+    args = parser.parse_args(argv)
+
+    risultati = esegui(args.righe, args.ripetizioni, args.piani)
+    documento = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': versione_codice(),
+        'python': platform.python_version(),
+        'piattaforma': platform.platform(),
+        'ripetizioni': args.ripetizioni,
+        'piani': args.piani,
+        'risultati': risultati
+    }
+
+    if args.confronta:
+        with open(args.confronta, 'r', encoding='utf-8') as file:
+            documento['confronto'] = confronta(risultati, json.load(file))
+        for c in documento['confronto']:
+            print(f"   {c['caso']:<42} {c['righe']:>9} righe  tempo ×{c['rapporto_tempo']:.2f}", file=sys.stderr)
+
+    output = args.output
+    if output is None:
+        os.makedirs(CARTELLA_RISULTATI, exist_ok=True)
+        output = os.path.join(CARTELLA_RISULTATI, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(documento, file, indent=2, ensure_ascii=False)
+    print(f"💾 Risultati salvati in {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
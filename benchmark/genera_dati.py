@@ -0,0 +1,135 @@
+"""
+Generatore di file output_ferri.txt sintetici per i benchmark
+Scrive file nello stesso formato dell'export reale: intestazione, sezioni per
+elemento racchiuse da separatori '=', gruppi per piano separati da '--------'
+e la sezione finale di controllo della somma. Il contenuto è deterministico
+per un dato seme.
+
+Uso:
+    python benchmark/genera_dati.py <file> --righe 1000000 [--piani 200] [--seme 0]
+    python benchmark/genera_dati.py <file.xlsx> --righe 100000
+
+Con estensione .xlsx viene scritto un workbook CME con una riga per posizione
+di armatura (elemento, piano, diametro, numero, lunghezza), letto da excel_ferri.
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser_ferri import ELEMENTI_VALIDI, SEPARATORE_SEZIONE, e_file_excel
+
+# Diametri commerciali delle barre (mm)
+DIAMETRI = (6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32)
+
+# Righe accumulate prima di ogni scrittura su file
+RIGHE_PER_SCRITTURA = 10000
+
+
+def nomi_piani(quanti):
+    """Nomi di piano realistici, poi numerati"""
+    base = ['Fondazione', 'Piano garage', 'Piano rialzato', 'Piano primo', 'Piano secondo', 'Piano mansarda']
+    return base[:quanti] + [f'Piano {n}' for n in range(3, quanti - len(base) + 3)]
+
+
+def riga_dati(piano, diametro, quantita):
+    """Riga dati con lo stesso allineamento dell'export reale"""
+    return f"{piano:<20}{'ø ' + str(diametro):>6}{quantita:>11.2f}\n"
+
+
+def genera_file(file_path, righe, piani=50, diametri=DIAMETRI, seme=0):
+    """Scrive un file sintetico con il numero di righe dati richiesto; restituisce la somma"""
+
+    casuale = random.Random(seme)
+    elenco_piani = nomi_piani(piani)
+    totale = 0.0
+
+    # Righe ripartite tra gli elementi, il resto al primo
+    per_elemento = [righe // len(ELEMENTI_VALIDI)] * len(ELEMENTI_VALIDI)
+    per_elemento[0] += righe - sum(per_elemento)
+
+    with open(file_path, 'w', encoding='utf-8', newline='\n') as file:
+        file.write(f"ANALISI FERRI STRUTTURALI - {datetime(2025, 1, 1).strftime('%d/%m/%Y %H:%M:%S')}\n")
+        file.write(f"File Excel: SINTETICO_{righe}.xlsx\n")
+        file.write('=' * 80 + '\n\n')
+
+        for elemento, quante in zip(ELEMENTI_VALIDI, per_elemento):
+            file.write(f"{SEPARATORE_SEZIONE}\n{elemento}\n{SEPARATORE_SEZIONE}\n")
+
+            # Righe distribuite sui piani, un gruppo '--------' per piano
+            per_piano = max(1, -(-quante // len(elenco_piani)))
+            buffer = []
+            scritte = 0
+            for piano in elenco_piani:
+                if scritte >= quante:
+                    break
+                buffer.append('--------\n')
+                for _ in range(min(per_piano, quante - scritte)):
+                    quantita = round(casuale.uniform(0.5, 5000.0), 2)
+                    totale += quantita
+                    buffer.append(riga_dati(piano, casuale.choice(diametri), quantita))
+                    scritte += 1
+                    if len(buffer) >= RIGHE_PER_SCRITTURA:
+                        file.write(''.join(buffer))
+                        buffer.clear()
+            file.write(''.join(buffer))
+            file.write('\n\n')
+
+        file.write(f"{SEPARATORE_SEZIONE}\nTEST SOMMA TOTALE FERRI\n{SEPARATORE_SEZIONE}\n")
+        file.write(f"Somma totale da output aggregato: {totale:.2f}\n")
+        file.write(f"Somma totale diretta di tutte le quantità dei ferri: {totale:.2f}\n")
+        file.write("Differenza (output - diretto): 0.00\n")
+
+    return totale
+
+
+def genera_excel(file_path, righe, piani=50, diametri=DIAMETRI, seme=0):
+    """Scrive un workbook CME sintetico (openpyxl in sola scrittura); restituisce la somma in kg"""
+    import openpyxl
+    from excel_ferri import peso_unitario
+
+    casuale = random.Random(seme)
+    elenco_piani = nomi_piani(piani)
+    totale = 0.0
+
+    workbook = openpyxl.Workbook(write_only=True)
+    foglio = workbook.create_sheet('CME')
+    foglio.append(['COMPUTO METRICO ESTIMATIVO - FERRI'])
+    foglio.append([])
+    foglio.append(['Elemento', 'Piano', 'Descrizione', 'Diametro', 'Numero', 'Lunghezza'])
+    for n in range(righe):
+        elemento = ELEMENTI_VALIDI[n % len(ELEMENTI_VALIDI)]
+        diametro = casuale.choice(diametri)
+        numero = casuale.randint(1, 40)
+        lunghezza = round(casuale.uniform(0.5, 12.0), 2)
+        totale += peso_unitario(diametro) * numero * lunghezza
+        # Diametri a volte come testo, come nei workbook compilati a mano
+        foglio.append([elemento.capitalize(), casuale.choice(elenco_piani), f'Posizione {n + 1}',
+                       diametro if n % 3 else f'ø{diametro}', numero, lunghezza])
+    foglio.append(['Totale', None, None, None, None, None])
+    workbook.save(file_path)
+    return totale
+
+
+def main(argv=None):
+    """Generazione da riga di comando"""
+    parser = argparse.ArgumentParser(description="Genera un file output_ferri.txt sintetico")
+    parser.add_argument('file', help="File da scrivere")
+    parser.add_argument('--righe', type=int, default=100000, help="Numero di righe dati")
+    parser.add_argument('--piani', type=int, default=50, help="Numero di piani distinti")
+    parser.add_argument('--seme', type=int, default=0, help="Seme del generatore casuale")
+    args = parser.parse_args(argv)
+
+    genera = genera_excel if e_file_excel(args.file) else genera_file
+    totale = genera(args.file, args.righe, args.piani, seme=args.seme)
+    print(f"✅ {args.file}: {args.righe} righe, {os.path.getsize(args.file) / 1e6:.1f} MB, "
+          f"totale {totale:.2f} kg")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Cache dei dati caricati, indicizzata su percorso, mtime e hash del contenuto
+Un file non modificato viene restituito senza rileggerlo; quando il file cambia
+viene sostituita solo la voce corrispondente al suo percorso.
+"""
+
+import hashlib
+import os
+import threading
+
+# Dimensione dei blocchi letti per calcolare l'hash
+BLOCCO_HASH = 1 << 20
+
+# Hash già calcolati: (percorso, mtime_ns, dimensione) -> sha256
+_hash_noti = {}
+_hash_lock = threading.Lock()
+
+
+def hash_file(file_path):
+    """SHA-256 del contenuto del file, letto a blocchi"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for blocco in iter(lambda: file.read(BLOCCO_HASH), b''):
+            digest.update(blocco)
+    return digest.hexdigest()
+
+
+def firma_file(file_path):
+    """Firma (percorso, mtime_ns, hash) del file; l'hash si ricalcola solo se mtime o dimensione cambiano"""
+    percorso = os.path.abspath(file_path)
+    info = os.stat(percorso)
+    chiave = (percorso, info.st_mtime_ns, info.st_size)
+
+    with _hash_lock:
+        digest = _hash_noti.get(chiave)
+    if digest is None:
+        digest = hash_file(percorso)
+        with _hash_lock:
+            # Tiene un solo hash per percorso
+            for vecchia in [k for k in _hash_noti if k[0] == percorso]:
+                del _hash_noti[vecchia]
+            _hash_noti[chiave] = digest
+
+    return percorso, info.st_mtime_ns, digest
+
+
+class CacheDati:
+    """Cache thread-safe percorso -> (firma, valore), condivisibile tra sessioni"""
+
+    def __init__(self):
+        self._voci = {}
+        self._lock = threading.Lock()
+        self._lock_percorsi = {}
+
+    def _lock_percorso(self, percorso):
+        with self._lock:
+            return self._lock_percorsi.setdefault(percorso, threading.Lock())
+
+    def carica(self, file_path, loader):
+        """Restituisce loader(file_path), ricalcolandolo solo se la firma del file è cambiata"""
+        return self.carica_con_firma(file_path, loader)[1]
+
+    def carica_con_firma(self, file_path, loader):
+        """Come carica, ma restituisce (firma, valore): la firma è quella con cui il valore è in cache"""
+        firma = firma_file(file_path)
+        percorso = firma[0]
+
+        with self._lock:
+            voce = self._voci.get(percorso)
+        if voce is not None and voce[0] == firma:
+            return voce
+
+        # Un solo caricamento per file anche con più sessioni concorrenti
+        with self._lock_percorso(percorso):
+            with self._lock:
+                voce = self._voci.get(percorso)
+            if voce is not None and voce[0] == firma:
+                return voce
+
+            voce = (firma, loader(file_path))
+            with self._lock:
+                self._voci[percorso] = voce
+            return voce
+
+    def invalida(self, file_path):
+        """Rimuove la voce di un singolo file"""
+        with self._lock:
+            self._voci.pop(os.path.abspath(file_path), None)
+
+    def __len__(self):
+        return len(self._voci)
@@ -0,0 +1,638 @@
+"""
+Contenitore colonnare per i dati dei ferri strutturali
+Elemento e piano sono codificati a dizionario, il diametro è un intero piccolo
+e la quantità un float64 (un float32 perderebbe le cifre oltre la settima,
+es. 123456.78 → 123456.8): ogni riga occupa 12 byte in array tipizzati
+invece di un dict Python per riga.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import chain
+
+from cache_ferri import hash_file
+from parser_ferri import (ELEMENTI_VALIDI, SUFFISSO_LAYOUT, StatisticheParsing, e_file_excel, e_file_storico,
+                          indicizza_sezioni, iter_file, iter_record_blocco)
+
+# Campi esposti da ogni riga, nello stesso ordine dei record del parser
+CAMPI = ('elemento', 'piano', 'diametro', 'quantita')
+
+# Colonne tipizzate e relativo typecode di array
+COLONNE = (('cod_elemento', 'B'), ('cod_piano', 'H'), ('diametro', 'B'),
+           ('quantita', 'd'), ('cod_sorgente', 'H'))
+
+# Campi di provenienza, presenti solo nei dataset con più file sorgente
+CAMPI_SORGENTE = ('progetto', 'file', 'data')
+
+
+def normalizza_selezione(selezione):
+    """Lista dei valori selezionati, oppure None se il campo non è filtrato ("Tutti")"""
+    if selezione is None or isinstance(selezione, (str, int)) and selezione == 'Tutti':
+        return None
+    if isinstance(selezione, (str, int)):
+        return [selezione]
+    valori = list(selezione)
+    if not valori or 'Tutti' in valori:
+        return None
+    return valori
+
+
+def _byte(colonna):
+    """Vista a byte di una colonna, array o memoryview tipizzata"""
+    return memoryview(colonna).cast('B')
+
+
+def _come_array(typecode, colonna):
+    """Copia una colonna (array o memoryview) in un array modificabile"""
+    copia = array(typecode)
+    copia.frombytes(_byte(colonna))
+    return copia
+
+
+class DatasetFerri:
+    """Dataset colonnare con elemento e piano codificati a dizionario"""
+
+    def __init__(self, elementi=None, piani=None):
+        # Dizionari codice -> valore (condivisi tra un dataset e le sue selezioni)
+        self.elementi = elementi if elementi is not None else []
+        self.piani = piani if piani is not None else []
+        self._codici = {}
+
+        # Colonne tipizzate
+        self.cod_elemento = array('B')
+        self.cod_piano = array('H')
+        self.diametro = array('B')
+        self.quantita = array('d')
+
+        # Provenienza: vuota se il dataset non ha informazioni sul file sorgente
+        self.sorgenti = []
+        self.cod_sorgente = array('H')
+
+        self._indice = None
+
+    @classmethod
+    def da_record(cls, records):
+        """Costruisce il dataset da un iterabile di (elemento, piano, diametro, quantità)"""
+        dataset = cls()
+        dataset.estendi(records)
+        return dataset
+
+    @classmethod
+    def da_file(cls, file_path, statistiche=None):
+        """Costruisce il dataset leggendo in streaming un file output_ferri.txt, un workbook Excel o un archivio"""
+        if e_file_storico(file_path):
+            # Esecuzione più recente dell'archivio storico
+            from storico_ferri import carica_storico
+            return carica_storico(file_path)
+        if e_file_excel(file_path):
+            from excel_ferri import iter_record_excel
+            return cls.da_record(iter_record_excel(file_path, statistiche))
+        return cls.da_record(iter_file(file_path, statistiche))
+
+    @classmethod
+    def concatena(cls, parti):
+        """Unisce più dataset in uno solo, ricodificando i dizionari se diversi"""
+        parti = list(parti)
+        if parti:
+            dataset = cls(parti[0].elementi, parti[0].piani)
+        else:
+            dataset = cls()
+        for parte in parti:
+            dataset.accoda(parte)
+        return dataset
+
+    def __len__(self):
+        return len(self.quantita)
+
+    def __getstate__(self):
+        # Le colonne mappate da un sidecar diventano array per poter essere serializzate
+        stato = dict(self.__dict__)
+        stato.pop('_mmap', None)
+        stato['_indice'] = None
+        for nome, typecode in COLONNE:
+            stato[nome] = _come_array(typecode, stato[nome])
+        return stato
+
+    def __iter__(self):
+        return self.righe()
+
+    @property
+    def nbytes(self):
+        """Memoria occupata dalle colonne (dizionari esclusi)"""
+        return sum(getattr(self, nome).itemsize * len(getattr(self, nome)) for nome, _ in COLONNE)
+
+    def imposta_sorgente(self, progetto, file, data=None):
+        """Assegna a tutte le righe un unico file sorgente"""
+        self.sorgenti = [{'progetto': progetto, 'file': file, 'data': data}]
+        self.cod_sorgente = array('H', [0]) * len(self)
+
+    def _codice_sorgente(self, sorgente):
+        for codice, nota in enumerate(self.sorgenti):
+            if nota == sorgente:
+                return codice
+        self.sorgenti.append(dict(sorgente))
+        return len(self.sorgenti) - 1
+
+    def _mappa_codici(self, campo):
+        """Dizionario valore -> codice, ricostruito se i valori sono cresciuti altrove"""
+        valori = self.elementi if campo == 'elemento' else self.piani
+        mappa = self._codici.get(campo)
+        if mappa is None or len(mappa) != len(valori):
+            mappa = self._codici[campo] = {valore: codice for codice, valore in enumerate(valori)}
+        return mappa
+
+    def codice(self, campo, valore, crea=False):
+        """Codice intero di un valore di elemento/piano (None se assente)"""
+        mappa = self._mappa_codici(campo)
+        codice = mappa.get(valore)
+        if codice is None and crea:
+            valori = self.elementi if campo == 'elemento' else self.piani
+            codice = len(valori)
+            valori.append(valore)
+            mappa[valore] = codice
+        return codice
+
+    def aggiungi(self, elemento, piano, diametro, quantita):
+        """Aggiunge una riga al dataset"""
+        self.cod_elemento.append(self.codice('elemento', elemento, crea=True))
+        self.cod_piano.append(self.codice('piano', piano, crea=True))
+        self.diametro.append(diametro)
+        self.quantita.append(quantita)
+
+    def estendi(self, records):
+        """Aggiunge in blocco le righe di un iterabile di record"""
+        codici_elementi = self._mappa_codici('elemento')
+        codici_piani = self._mappa_codici('piano')
+        add_elemento = self.cod_elemento.append
+        add_piano = self.cod_piano.append
+        add_diametro = self.diametro.append
+        add_quantita = self.quantita.append
+
+        for elemento, piano, diametro, quantita in records:
+            codice = codici_elementi.get(elemento)
+            if codice is None:
+                codice = codici_elementi[elemento] = len(self.elementi)
+                self.elementi.append(elemento)
+            add_elemento(codice)
+
+            codice = codici_piani.get(piano)
+            if codice is None:
+                codice = codici_piani[piano] = len(self.piani)
+                self.piani.append(piano)
+            add_piano(codice)
+
+            add_diametro(diametro)
+            add_quantita(quantita)
+
+    def _ricodifica(self, altro, campo):
+        """Codici di `altro` tradotti nel dizionario di questo dataset"""
+        if campo == 'elemento':
+            valori, codici = altro.elementi, altro.cod_elemento
+            if valori is self.elementi:
+                return codici
+            mappa = [self.codice(campo, v, crea=True) for v in valori]
+            return array('B', bytes(codici).translate(bytes(mappa + [0] * (256 - len(mappa)))))
+
+        valori, codici = altro.piani, altro.cod_piano
+        if valori is self.piani:
+            return codici
+        mappa = [self.codice(campo, v, crea=True) for v in valori]
+        return array('H', [mappa[c] for c in codici])
+
+    def accoda(self, altro):
+        """Aggiunge in coda tutte le righe di un altro dataset"""
+        if self.sorgenti or altro.sorgenti:
+            # Le righe senza provenienza ricevono una sorgente anonima
+            anonima = {'progetto': None, 'file': None, 'data': None}
+            if len(self.cod_sorgente) < len(self):
+                codice = self._codice_sorgente(anonima)
+                self.cod_sorgente.extend(array('H', [codice]) * (len(self) - len(self.cod_sorgente)))
+            if altro.sorgenti:
+                mappa = [self._codice_sorgente(s) for s in altro.sorgenti]
+                if mappa == list(range(len(mappa))):
+                    self.cod_sorgente.frombytes(_byte(altro.cod_sorgente))
+                else:
+                    self.cod_sorgente.extend(array('H', [mappa[c] for c in altro.cod_sorgente]))
+            else:
+                self.cod_sorgente.extend(array('H', [self._codice_sorgente(anonima)]) * len(altro))
+
+        # frombytes copia il buffer in blocco, anche da colonne mappate in memoria
+        self.cod_elemento.frombytes(_byte(self._ricodifica(altro, 'elemento')))
+        self.cod_piano.frombytes(_byte(self._ricodifica(altro, 'piano')))
+        self.diametro.frombytes(_byte(altro.diametro))
+        self.quantita.frombytes(_byte(altro.quantita))
+
+    def colonna(self, campo):
+        """Valori decodificati di una colonna"""
+        if campo == 'elemento':
+            elementi = self.elementi
+            return [elementi[c] for c in self.cod_elemento]
+        if campo == 'piano':
+            piani = self.piani
+            return [piani[c] for c in self.cod_piano]
+        if campo == 'diametro':
+            return list(self.diametro)
+        if campo == 'quantita':
+            return list(self.quantita)
+        if campo in CAMPI_SORGENTE and self.sorgenti:
+            valori = [s[campo] for s in self.sorgenti]
+            return [valori[c] for c in self.cod_sorgente]
+        raise KeyError(campo)
+
+    def riga(self, i):
+        """Riga i-esima come dict"""
+        riga = {
+            'elemento': self.elementi[self.cod_elemento[i]],
+            'piano': self.piani[self.cod_piano[i]],
+            'diametro': self.diametro[i],
+            'quantita': self.quantita[i]
+        }
+        if self.sorgenti:
+            riga.update(self.sorgenti[self.cod_sorgente[i]])
+        return riga
+
+    def righe(self):
+        """Generatore di righe come dict, per chi si aspetta il vecchio formato"""
+        if self.sorgenti:
+            for i in range(len(self)):
+                yield self.riga(i)
+            return
+
+        elementi = self.elementi
+        piani = self.piani
+        for e, p, d, q in zip(self.cod_elemento, self.cod_piano, self.diametro, self.quantita):
+            yield {'elemento': elementi[e], 'piano': piani[p], 'diametro': d, 'quantita': q}
+
+    def valori_unici(self, campo):
+        """Valori distinti presenti in una colonna"""
+        if campo == 'elemento':
+            return [self.elementi[c] for c in set(self.cod_elemento)]
+        if campo == 'piano':
+            return [self.piani[c] for c in set(self.cod_piano)]
+        if campo == 'diametro':
+            return list(set(self.diametro))
+        if campo in CAMPI_SORGENTE and self.sorgenti:
+            return list({self.sorgenti[c][campo] for c in set(self.cod_sorgente)})
+        raise KeyError(campo)
+
+    def indice(self):
+        """Indice posizionale del dataset, costruito alla prima richiesta"""
+        if self._indice is None or self._indice.righe != len(self):
+            self._indice = IndiceFerri.da_dataset(self)
+        return self._indice
+
+    def filtra(self, elemento=None, piano=None, diametro=None):
+        """Indici delle righe che soddisfano i filtri (valore singolo o lista di valori)"""
+        return self.indice().filtra(elemento, piano, diametro)
+
+    def seleziona(self, indici):
+        """Nuovo dataset con le sole righe indicate (dizionari condivisi)"""
+        selezione = DatasetFerri(self.elementi, self.piani)
+        selezione.sorgenti = self.sorgenti
+        if isinstance(indici, range) and indici == range(len(self)):
+            selezione.cod_elemento = _come_array('B', self.cod_elemento)
+            selezione.cod_piano = _come_array('H', self.cod_piano)
+            selezione.diametro = _come_array('B', self.diametro)
+            selezione.quantita = _come_array('d', self.quantita)
+            selezione.cod_sorgente = _come_array('H', self.cod_sorgente)
+            return selezione
+
+        cod_elemento = self.cod_elemento
+        cod_piano = self.cod_piano
+        diametro = self.diametro
+        quantita = self.quantita
+        selezione.cod_elemento = array('B', [cod_elemento[i] for i in indici])
+        selezione.cod_piano = array('H', [cod_piano[i] for i in indici])
+        selezione.diametro = array('B', [diametro[i] for i in indici])
+        selezione.quantita = array('d', [quantita[i] for i in indici])
+        if self.sorgenti:
+            cod_sorgente = self.cod_sorgente
+            selezione.cod_sorgente = array('H', [cod_sorgente[i] for i in indici])
+        return selezione
+
+    def raggruppa(self, campo):
+        """Somma delle quantità per valore di un campo, calcolata sui codici"""
+        if campo == 'elemento':
+            codici, valori = self.cod_elemento, self.elementi
+        elif campo == 'piano':
+            codici, valori = self.cod_piano, self.piani
+        elif campo == 'diametro':
+            codici, valori = self.diametro, None
+        else:
+            raise KeyError(campo)
+
+        somme = {}
+        for c, q in zip(codici, self.quantita):
+            somme[c] = somme.get(c, 0.0) + q
+
+        if valori is None:
+            return somme
+        return {valori[c]: totale for c, totale in somme.items()}
+
+
+class IndiceFerri:
+    """Indici posizionali: per ogni valore di elemento, piano e diametro la lista ordinata delle righe"""
+
+    def __init__(self, cod_elemento, cod_piano, diametro, elementi, piani):
+        self.righe = len(diametro)
+        self.colonne = {'elemento': cod_elemento, 'piano': cod_piano, 'diametro': diametro}
+        self.codici = {
+            'elemento': {valore: codice for codice, valore in enumerate(elementi)},
+            'piano': {valore: codice for codice, valore in enumerate(piani)}
+        }
+        self.posizioni = {campo: self._costruisci(colonna) for campo, colonna in self.colonne.items()}
+
+    @classmethod
+    def da_dataset(cls, dataset):
+        return cls(dataset.cod_elemento, dataset.cod_piano, dataset.diametro, dataset.elementi, dataset.piani)
+
+    @staticmethod
+    def _costruisci(colonna):
+        posizioni = {}
+        for i, codice in enumerate(colonna):
+            lista = posizioni.get(codice)
+            if lista is None:
+                lista = posizioni[codice] = array('I')
+            lista.append(i)
+        return posizioni
+
+    def _codici_ammessi(self, campo, selezione):
+        """Insieme dei codici selezionati per un campo, None se il campo non è filtrato"""
+        valori = normalizza_selezione(selezione)
+        if valori is None:
+            return None
+        if campo == 'diametro':
+            return {int(v) for v in valori}
+        mappa = self.codici[campo]
+        return {mappa[v] for v in valori if v in mappa}
+
+    def filtra(self, elemento=None, piano=None, diametro=None):
+        """Righe selezionate: OR dei valori di ogni campo, AND tra i campi"""
+        ammessi = {}
+        for campo, selezione in (('elemento', elemento), ('piano', piano), ('diametro', diametro)):
+            codici = self._codici_ammessi(campo, selezione)
+            if codici is not None:
+                ammessi[campo] = codici
+
+        if not ammessi:
+            return range(self.righe)
+
+        # Si parte dal campo più selettivo: il costo segue le righe candidate, non la tabella
+        def candidati(campo):
+            posizioni = self.posizioni[campo]
+            return sum(len(posizioni.get(c, ())) for c in ammessi[campo])
+
+        guida = min(ammessi, key=candidati)
+        posizioni = self.posizioni[guida]
+        liste = [posizioni[c] for c in ammessi.pop(guida) if c in posizioni]
+        if not liste:
+            return []
+        if len(liste) == 1:
+            righe = list(liste[0])
+        else:
+            righe = sorted(chain.from_iterable(liste))
+
+        for campo, codici in ammessi.items():
+            colonna = self.colonne[campo]
+            if len(codici) == 1:
+                codice, = codici
+                righe = [i for i in righe if colonna[i] == codice]
+            else:
+                righe = [i for i in righe if colonna[i] in codici]
+        return righe
+
+
+# File binario colonnare salvato accanto al sorgente
+ESTENSIONE_SIDECAR = '.ferri.bin'
+MAGIC_SIDECAR = b'FERRIBIN'
+VERSIONE_SIDECAR = 3
+ALLINEAMENTO = 8
+
+
+def percorso_sidecar(file_path):
+    """Percorso del sidecar binario associato a un file sorgente"""
+    return file_path + ESTENSIONE_SIDECAR
+
+
+def _firma_sorgente(file_path):
+    """Dimensione e hash del contenuto: una riscrittura con stessa dimensione e mtime non sfugge"""
+    firma = {'dimensione': os.path.getsize(file_path), 'sha256': hash_file(file_path)}
+
+    # Per i workbook anche il layout delle colonne cambia il risultato
+    layout = file_path + SUFFISSO_LAYOUT
+    if e_file_excel(file_path) and os.path.exists(layout):
+        firma['layout_sha256'] = hash_file(layout)
+    return firma
+
+
+def salva_sidecar(dataset, file_path, blocchi=None, firma=None):
+    """Scrive il dataset in formato colonnare accanto al file sorgente (scrittura atomica)
+
+    firma è quella del sorgente letto per costruire il dataset: calcolata prima
+    del parsing, una modifica fatta nel frattempo invalida il sidecar.
+    """
+    colonne = []
+    offset = 0
+    for nome, typecode in COLONNE:
+        lunghezza = len(getattr(dataset, nome)) * array(typecode).itemsize
+        colonne.append({'nome': nome, 'tipo': typecode, 'offset': offset, 'lunghezza': lunghezza})
+        offset += -(-lunghezza // ALLINEAMENTO) * ALLINEAMENTO
+
+    intestazione = json.dumps({
+        'versione': VERSIONE_SIDECAR,
+        'byteorder': sys.byteorder,
+        'sorgente': firma or _firma_sorgente(file_path),
+        'righe': len(dataset),
+        'elementi': dataset.elementi,
+        'piani': dataset.piani,
+        'sorgenti': dataset.sorgenti,
+        'blocchi': blocchi or [],
+        'colonne': colonne
+    }).encode('utf-8')
+    inizio_dati = -(-(len(MAGIC_SIDECAR) + 4 + len(intestazione)) // ALLINEAMENTO) * ALLINEAMENTO
+
+    destinazione = percorso_sidecar(file_path)
+    temporaneo = f"{destinazione}.{os.getpid()}.tmp"
+    with open(temporaneo, 'wb') as file:
+        file.write(MAGIC_SIDECAR)
+        file.write(struct.pack('<I', len(intestazione)))
+        file.write(intestazione)
+        for colonna in colonne:
+            file.seek(inizio_dati + colonna['offset'])
+            file.write(_byte(getattr(dataset, colonna['nome'])))
+        file.truncate(inizio_dati + offset)
+    try:
+        os.replace(temporaneo, destinazione)
+    except OSError:
+        os.remove(temporaneo)
+        raise
+    return destinazione
+
+
+def _prova_salva_sidecar(dataset, file_path, blocchi=None, firma=None):
+    """Salva il sidecar; se non si può lo segnala su stderr e si prosegue senza
+
+    Succede con una cartella in sola lettura e, su Windows, quando il vecchio
+    sidecar è ancora mappato in memoria da un dataset in uso (PermissionError).
+    """
+    try:
+        salva_sidecar(dataset, file_path, blocchi, firma)
+    except OSError as e:
+        print(f"⚠️ Sidecar non salvato per {file_path}: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+def _leggi_sidecar(file_path, firma=None):
+    """(dataset mappato, intestazione) dal sidecar, oppure (None, None) se assente o non più valido"""
+    destinazione = percorso_sidecar(file_path)
+    try:
+        with open(destinazione, 'rb') as file:
+            mappa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None, None
+
+    try:
+        if mappa[:len(MAGIC_SIDECAR)] != MAGIC_SIDECAR:
+            raise ValueError("formato non riconosciuto")
+        lunghezza, = struct.unpack_from('<I', mappa, len(MAGIC_SIDECAR))
+        inizio = len(MAGIC_SIDECAR) + 4
+        intestazione = json.loads(mappa[inizio:inizio + lunghezza].decode('utf-8'))
+        if intestazione['versione'] != VERSIONE_SIDECAR or intestazione['byteorder'] != sys.byteorder:
+            raise ValueError("formato non aggiornato")
+        # La dimensione scarta subito i sidecar vecchi, l'hash conferma gli altri
+        if (intestazione['sorgente']['dimensione'] != os.path.getsize(file_path)
+                or intestazione['sorgente'] != (firma or _firma_sorgente(file_path))):
+            raise ValueError("sidecar non aggiornato")
+    except (ValueError, KeyError, OSError, struct.error):
+        mappa.close()
+        return None, None
+
+    inizio_dati = -(-(inizio + lunghezza) // ALLINEAMENTO) * ALLINEAMENTO
+    vista = memoryview(mappa)
+    dataset = DatasetFerri(intestazione['elementi'], intestazione['piani'])
+    dataset.sorgenti = intestazione['sorgenti']
+    for colonna in intestazione['colonne']:
+        inizio = inizio_dati + colonna['offset']
+        dati = vista[inizio:inizio + colonna['lunghezza']].cast(colonna['tipo'])
+        setattr(dataset, colonna['nome'], dati)
+    dataset._mmap = mappa
+    return dataset, intestazione
+
+
+def carica_sidecar(file_path, firma=None):
+    """Dataset mappato in memoria dal sidecar, oppure None se assente o non più valido"""
+    return _leggi_sidecar(file_path, firma)[0]
+
+
+def carica_dataset(file_path, statistiche=None, sidecar=True):
+    """Carica il dataset dal sidecar se valido, altrimenti analizza il testo e salva il sidecar"""
+    # Un archivio SQLite è già indicizzato: nessun sidecar
+    sidecar = sidecar and not e_file_storico(file_path)
+    if sidecar:
+        firma = _firma_sorgente(file_path)
+        dataset = carica_sidecar(file_path, firma)
+        if dataset is not None:
+            return dataset
+
+    dataset = DatasetFerri.da_file(file_path, statistiche)
+    if sidecar:
+        _prova_salva_sidecar(dataset, file_path, firma=firma)
+    return dataset
+
+
+class CaricatoreIncrementale:
+    """Ricarica un file riparsando solo i blocchi di sezione con checksum cambiato"""
+
+    def __init__(self, sidecar=True):
+        # Dizionari condivisi da tutti i blocchi, così la concatenazione è una copia di array
+        self.elementi = []
+        self.piani = []
+        self.sidecar = sidecar
+        self._blocchi = {}   # checksum -> DatasetFerri del blocco
+        self.ultimo_caricamento = {}
+
+    def _da_sidecar(self, file_path, firma):
+        """Al primo caricamento riprende dataset e blocchi dal sidecar, se valido"""
+        dataset, intestazione = _leggi_sidecar(file_path, firma)
+        if dataset is None:
+            return None
+        if len(dataset) and not intestazione['blocchi']:
+            # Sidecar scritto da carica_dataset, senza blocchi: meglio riparsare una volta e salvarli
+            return None
+
+        self.elementi = dataset.elementi
+        self.piani = dataset.piani
+        self._blocchi = {}
+        for checksum, inizio, fine in intestazione['blocchi']:
+            parte = DatasetFerri(self.elementi, self.piani)
+            for nome, _ in COLONNE[:4]:
+                setattr(parte, nome, getattr(dataset, nome)[inizio:fine])
+            self._blocchi[checksum] = parte
+
+        self.ultimo_caricamento = {'blocchi': len(intestazione['blocchi']), 'riparsati': 0, 'sidecar': True}
+        return dataset
+
+    def carica(self, file_path, statistiche=None):
+        """Restituisce il dataset del file, riusando i blocchi invariati dall'ultimo caricamento"""
+        if e_file_excel(file_path) or e_file_storico(file_path):
+            # Workbook e archivi non hanno blocchi di sezione: caricamento intero
+            self._blocchi = {}
+            statistiche = statistiche if statistiche is not None else StatisticheParsing()
+            dataset = carica_dataset(file_path, statistiche, self.sidecar)
+            self.ultimo_caricamento = {'blocchi': 0, 'riparsati': 0,
+                                       'sidecar': self.sidecar and e_file_excel(file_path) and statistiche.righe == 0}
+            return dataset
+
+        firma = _firma_sorgente(file_path) if self.sidecar else None
+        if self.sidecar and not self._blocchi:
+            dataset = self._da_sidecar(file_path, firma)
+            if dataset is not None:
+                return dataset
+
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                contenuto = b''
+            else:
+                contenuto = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            try:
+                blocchi = indicizza_sezioni(contenuto)
+                parti = []
+                nuovi = {}
+                riparsati = 0
+
+                for blocco in blocchi:
+                    if blocco.nome not in ELEMENTI_VALIDI:
+                        continue
+                    parte = nuovi.get(blocco.checksum)
+                    if parte is None:
+                        parte = self._blocchi.get(blocco.checksum)
+                    if parte is None:
+                        parte = DatasetFerri(self.elementi, self.piani)
+                        parte.estendi(iter_record_blocco(contenuto, blocco, statistiche))
+                        riparsati += 1
+                    nuovi[blocco.checksum] = parte
+                    parti.append(parte)
+            finally:
+                if isinstance(contenuto, mmap.mmap):
+                    contenuto.close()
+
+        self._blocchi = nuovi
+        self.ultimo_caricamento = {
+            'blocchi': len(parti),
+            'riparsati': riparsati,
+            'sezioni': [(b.nome, b.inizio, b.fine, b.checksum) for b in blocchi]
+        }
+
+        dataset = DatasetFerri(self.elementi, self.piani)
+        righe_blocchi = []
+        for blocco, parte in zip((b for b in blocchi if b.nome in ELEMENTI_VALIDI), parti):
+            righe_blocchi.append((blocco.checksum, len(dataset), len(dataset) + len(parte)))
+            dataset.accoda(parte)
+
+        if self.sidecar and riparsati:
+            _prova_salva_sidecar(dataset, file_path, righe_blocchi, firma)
+        return dataset
@@ -0,0 +1,278 @@
+"""
+Lettura diretta del workbook Excel del computo (CME)
+Il foglio viene letto in streaming (openpyxl in sola lettura), a blocchi di
+righe: per ogni riga il peso è calcolato dal peso unitario della barra
+(kg/m = 0.00617 · d², acciaio 7850 kg/m³) per lunghezza e numero di barre,
+con calcolo vettoriale numpy quando disponibile. Il risultato sono gli stessi
+record (elemento, piano, diametro, kg) del parser testuale.
+
+La disposizione delle colonne è configurabile: il layout predefinito può essere
+sovrascritto da un file <workbook>.layout.json accanto al workbook.
+
+Uso:
+    python excel_ferri.py <workbook.xlsx> [--foglio NOME] [--colonna campo=Intestazione ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from parser_ferri import ELEMENTI_VALIDI, SUFFISSO_LAYOUT, StatisticheParsing
+
+# Peso unitario delle barre: kg/m per mm² di diametro al quadrato
+KG_M_PER_MM2 = 0.00617
+
+# Layout predefinito: foglio (None = attivo), riga di intestazione (None = cercata) e intestazioni
+LAYOUT_PREDEFINITO = {
+    'foglio': None,
+    'riga_intestazione': None,
+    'scala_lunghezza': 1.0,
+    'colonne': {
+        'elemento': 'Elemento',
+        'piano': 'Piano',
+        'diametro': 'Diametro',
+        'lunghezza': 'Lunghezza',
+        'numero': 'Numero'
+    }
+}
+
+# Campi obbligatori; 'numero' mancante vale 1 barra per riga
+CAMPI_OBBLIGATORI = ('elemento', 'piano', 'diametro', 'lunghezza')
+
+# Righe esaminate per trovare l'intestazione e righe per blocco di calcolo
+MAX_RIGHE_INTESTAZIONE = 20
+RIGHE_PER_BLOCCO = 1 << 16
+
+# Nomi di elemento al singolare o in minuscolo ricondotti a quelli del testo
+ALIAS_ELEMENTI = {'PILASTRO': 'PILASTRI', 'TRAVE': 'TRAVI', 'PARETE': 'PARETI', 'FONDAZIONI': 'FONDAZIONE'}
+
+DIAMETRO_PATTERN = re.compile(r'\d+')
+
+
+def _openpyxl():
+    """Importa openpyxl solo quando serve leggere un workbook"""
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Per leggere i workbook Excel installa openpyxl (pip install openpyxl)") from None
+    return openpyxl
+
+
+def peso_unitario(diametro):
+    """Peso della barra in kg/m dato il diametro in mm"""
+    return KG_M_PER_MM2 * diametro * diametro
+
+
+def carica_layout(file_path, layout=None):
+    """Layout predefinito, aggiornato da <workbook>.layout.json e poi da quello passato"""
+    risultato = dict(LAYOUT_PREDEFINITO, colonne=dict(LAYOUT_PREDEFINITO['colonne']))
+    percorso = file_path + SUFFISSO_LAYOUT
+    sovrascritture = []
+    if os.path.exists(percorso):
+        with open(percorso, 'r', encoding='utf-8') as file:
+            sovrascritture.append(json.load(file))
+    if layout:
+        sovrascritture.append(layout)
+
+    for valori in sovrascritture:
+        for chiave, valore in valori.items():
+            if chiave == 'colonne':
+                risultato['colonne'].update(valore)
+            else:
+                risultato[chiave] = valore
+    return risultato
+
+
+def normalizza_elemento(valore):
+    """Nome dell'elemento come nelle sezioni del testo, oppure None se non riconosciuto"""
+    if valore is None:
+        return None
+    nome = str(valore).strip().upper()
+    nome = ALIAS_ELEMENTI.get(nome, nome)
+    return nome if nome in ELEMENTI_VALIDI else None
+
+
+def normalizza_diametro(valore):
+    """Diametro in mm da un numero o da un testo come 'ø16' / 'Ø 16 mm'"""
+    if isinstance(valore, (int, float)):
+        return int(valore)
+    match = DIAMETRO_PATTERN.search(str(valore or ''))
+    return int(match.group()) if match else None
+
+
+def trova_colonne(righe, layout):
+    """(numero riga di intestazione, {campo: indice colonna}) dalle prime righe del foglio"""
+    intestazioni = {campo: str(nome).strip().lower() for campo, nome in layout['colonne'].items()}
+    for numero, riga in enumerate(righe, start=1):
+        if layout['riga_intestazione'] and numero != layout['riga_intestazione']:
+            continue
+        celle = [str(c).strip().lower() if c is not None else '' for c in riga]
+        indici = {campo: celle.index(nome) for campo, nome in intestazioni.items() if nome in celle}
+        if all(campo in indici for campo in CAMPI_OBBLIGATORI):
+            return numero, indici
+        if numero >= (layout['riga_intestazione'] or MAX_RIGHE_INTESTAZIONE):
+            break
+    mancanti = ', '.join(layout['colonne'][c] for c in CAMPI_OBBLIGATORI)
+    raise ValueError(f"Intestazione non trovata: servono le colonne {mancanti}")
+
+
+def iter_blocchi(file_path, layout=None, statistiche=None):
+    """Generatore di blocchi di colonne (elemento, piano, diametro, lunghezza, numero) letti in streaming"""
+
+    if statistiche is None:
+        statistiche = StatisticheParsing()
+    layout = carica_layout(file_path, layout)
+    scala = float(layout['scala_lunghezza'])
+
+    workbook = _openpyxl().load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        foglio = workbook[layout['foglio']] if layout['foglio'] else workbook.active
+        righe = foglio.iter_rows(values_only=True)
+
+        intestazione = []
+        for riga in righe:
+            statistiche.righe += 1
+            intestazione.append(riga)
+            if len(intestazione) >= (layout['riga_intestazione'] or MAX_RIGHE_INTESTAZIONE):
+                break
+        numero_intestazione, indici = trova_colonne(intestazione, layout)
+
+        # Righe già lette dopo l'intestazione, poi il resto del foglio
+        da_leggere = intestazione[numero_intestazione:]
+        blocco = {campo: [] for campo in ('elemento', 'piano', 'diametro', 'lunghezza', 'numero')}
+        i_elemento, i_piano, i_diametro, i_lunghezza = (indici[c] for c in CAMPI_OBBLIGATORI)
+        i_numero = indici.get('numero')
+
+        def righe_dati():
+            yield from da_leggere
+            for riga in righe:
+                statistiche.righe += 1
+                yield riga
+
+        for riga in righe_dati():
+            if len(riga) <= max(indici.values()):
+                continue
+            elemento = normalizza_elemento(riga[i_elemento])
+            diametro = normalizza_diametro(riga[i_diametro])
+            piano = str(riga[i_piano] or '').strip()
+            lunghezza = riga[i_lunghezza]
+            if elemento is None or diametro is None or not piano or not isinstance(lunghezza, (int, float)):
+                # Righe di totale, vuote o di altri elementi
+                continue
+            numero = riga[i_numero] if i_numero is not None else 1
+            if not isinstance(numero, (int, float)):
+                numero = 1
+
+            blocco['elemento'].append(elemento)
+            blocco['piano'].append(piano)
+            blocco['diametro'].append(diametro)
+            blocco['lunghezza'].append(lunghezza * scala)
+            blocco['numero'].append(numero)
+
+            if len(blocco['elemento']) >= RIGHE_PER_BLOCCO:
+                yield blocco
+                blocco = {campo: [] for campo in blocco}
+        if blocco['elemento']:
+            yield blocco
+    finally:
+        workbook.close()
+
+
+def _somma_blocco_numpy(blocco, totali):
+    """Pesi del blocco calcolati in modo vettoriale e sommati per (elemento, piano, diametro)"""
+    diametro = np.asarray(blocco['diametro'], dtype=np.float64)
+    pesi = KG_M_PER_MM2 * diametro * diametro * np.asarray(blocco['lunghezza'], dtype=np.float64) \
+        * np.asarray(blocco['numero'], dtype=np.float64)
+
+    # Chiavi codificate come interi per sommare con bincount
+    codici = {}
+    chiavi = np.fromiter(
+        (codici.setdefault(chiave, len(codici))
+         for chiave in zip(blocco['elemento'], blocco['piano'], blocco['diametro'])),
+        dtype=np.int64, count=len(pesi)
+    )
+    somme = np.bincount(chiavi, weights=pesi, minlength=len(codici))
+    for chiave, codice in codici.items():
+        totali[chiave] = totali.get(chiave, 0.0) + float(somme[codice])
+
+
+def _somma_blocco(blocco, totali):
+    """Versione senza numpy di _somma_blocco_numpy"""
+    for chiave in zip(blocco['elemento'], blocco['piano'], blocco['diametro'], blocco['lunghezza'], blocco['numero']):
+        elemento, piano, diametro, lunghezza, numero = chiave
+        totali[elemento, piano, diametro] = (totali.get((elemento, piano, diametro), 0.0)
+                                             + peso_unitario(diametro) * lunghezza * numero)
+
+
+def iter_record_excel(file_path, statistiche=None, layout=None):
+    """Generatore di record (elemento, piano, diametro, kg) aggregati dal workbook"""
+
+    if statistiche is None:
+        statistiche = StatisticheParsing()
+    inizio = time.perf_counter()
+
+    totali = {}
+    somma_blocco = _somma_blocco_numpy if np is not None else _somma_blocco
+    try:
+        for blocco in iter_blocchi(file_path, layout, statistiche):
+            somma_blocco(blocco, totali)
+    finally:
+        statistiche.secondi += time.perf_counter() - inizio
+
+    # Stesso ordine dell'export testuale: sezione, piano (ordine di apparizione), diametro
+    ordine_piani = {}
+    for _, piano, _ in totali:
+        ordine_piani.setdefault(piano, len(ordine_piani))
+    ordine_elementi = {nome: i for i, nome in enumerate(ELEMENTI_VALIDI)}
+    for elemento, piano, diametro in sorted(totali, key=lambda k: (ordine_elementi[k[0]], ordine_piani[k[1]], k[2])):
+        statistiche.record += 1
+        yield elemento, piano, diametro, round(totali[elemento, piano, diametro], 2)
+
+
+def leggi_intestazione_excel(file_path):
+    """Data di ultima modifica del workbook e nome del file, come l'intestazione del testo"""
+    workbook = _openpyxl().load_workbook(file_path, read_only=True)
+    try:
+        data = workbook.properties.modified or workbook.properties.created
+    finally:
+        workbook.close()
+    if data is None:
+        data = datetime.fromtimestamp(os.path.getmtime(file_path))
+    return {'data': data.replace(microsecond=0), 'file_excel': os.path.basename(file_path)}
+
+
+def main(argv=None):
+    """Lettura di un workbook da riga di comando con riepilogo per elemento"""
+    parser = argparse.ArgumentParser(description="Legge i ferri direttamente dal workbook Excel del CME")
+    parser.add_argument('workbook', help="File .xlsx da leggere")
+    parser.add_argument('--foglio', default=None, help="Nome del foglio (default: foglio attivo)")
+    parser.add_argument('--colonna', action='append', default=[], metavar='CAMPO=INTESTAZIONE',
+                        help="Intestazione di una colonna (elemento, piano, diametro, lunghezza, numero)")
+    args = parser.parse_args(argv)
+
+    layout = {'colonne': dict(c.split('=', 1) for c in args.colonna)}
+    if args.foglio:
+        layout['foglio'] = args.foglio
+
+    statistiche = StatisticheParsing()
+    totali = {}
+    for elemento, _, _, kg in iter_record_excel(args.workbook, statistiche, layout):
+        totali[elemento] = totali.get(elemento, 0.0) + kg
+
+    for elemento, kg in totali.items():
+        print(f"{elemento:<12} {kg:>12.2f} kg")
+    print(f"⏱️  {statistiche}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
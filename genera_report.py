@@ -0,0 +1,179 @@
+"""
+Generazione in batch dei report HTML, senza interazione
+Accetta cartelle, glob o singoli file e scrive un report per revisione (un file)
+oppure per progetto (tutte le revisioni unite), in un pool di processi.
+Stampa su stdout un riepilogo JSON con tempi e dimensioni ed esce con codice 1
+se almeno un report non è stato generato.
+
+Uso:
+    python genera_report.py <cartella|glob|file> [...] [--output DIR] [--per progetto|revisione] [--processi N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from dataset_ferri import DatasetFerri
+from ingest_ferri import PATTERN_CARTELLA, esegui_in_pool, ingest_file, nome_progetto, trova_file
+from parser_ferri import leggi_intestazione
+from visualizzatore_semplice import scrivi_report
+
+# Cartella di destinazione predefinita dei report
+CARTELLA_OUTPUT = 'report'
+
+# Caratteri non ammessi nei nomi dei file generati
+NOME_NON_VALIDO = re.compile(r'[^\w.-]+')
+
+
+def nome_file_report(nome):
+    """Nome di file sicuro per un report"""
+    return NOME_NON_VALIDO.sub('_', nome).strip('_') or 'report'
+
+
+def pianifica_report(files, per='revisione'):
+    """Raggruppa i file in report: {nome report: [file, ...]}"""
+
+    gruppi = {}
+    for file_path in files:
+        try:
+            intestazione = leggi_intestazione(file_path)
+        except (OSError, UnicodeDecodeError, ValueError):
+            # L'errore verrà riportato dal worker che prova a leggerlo
+            intestazione = {'data': None, 'file_excel': None}
+        progetto = nome_progetto(file_path, intestazione)
+        if per == 'progetto':
+            nome = progetto
+        else:
+            # Una revisione è identificata dalla data di analisi, altrimenti dal nome del file
+            revisione = (intestazione['data'].strftime('%Y%m%d_%H%M%S') if intestazione['data']
+                         else os.path.splitext(os.path.basename(file_path))[0])
+            nome = f"{progetto}_{revisione}"
+        nome = nome_file_report(nome)
+
+        # Nomi uguali da cartelle diverse non si sovrascrivono
+        if per != 'progetto':
+            base, n = nome, 1
+            while nome in gruppi:
+                n += 1
+                nome = f"{base}_{n}"
+        gruppi.setdefault(nome, []).append(file_path)
+    return gruppi
+
+
+def genera_report(files, output_path, comprimi=None, sidecar=False):
+    """Carica i file, li unisce e scrive un report; restituisce record e tempi"""
+
+    inizio = time.perf_counter()
+    dataset = DatasetFerri.concatena(ingest_file(f, sidecar)[0] for f in files)
+    caricamento = time.perf_counter() - inizio
+
+    # Scrittura su file temporaneo: un report a metà non sostituisce quello precedente
+    temporaneo = output_path + '.tmp'
+    try:
+        with open(temporaneo, 'w', encoding='utf-8') as output:
+            scrivi_report(dataset, output, comprimi, fonte=', '.join(os.path.basename(f) for f in files))
+        os.replace(temporaneo, output_path)
+    except BaseException:
+        if os.path.exists(temporaneo):
+            os.remove(temporaneo)
+        raise
+
+    return {
+        'record': len(dataset),
+        'secondi_caricamento': caricamento,
+        'secondi_scrittura': time.perf_counter() - inizio - caricamento,
+        'byte': os.path.getsize(output_path)
+    }
+
+
+def _genera_worker(nome, files, output_path, comprimi, sidecar=False):
+    """Eseguito nel processo figlio: gli errori tornano come testo"""
+    inizio = time.perf_counter()
+    esito = {'report': nome, 'file': files, 'output': output_path, 'errore': None}
+    try:
+        esito.update(genera_report(files, output_path, comprimi, sidecar))
+    except Exception as e:
+        esito['errore'] = f"{type(e).__name__}: {e}"
+    esito['secondi'] = time.perf_counter() - inizio
+    return esito
+
+
+def genera_batch(sorgenti, cartella=CARTELLA_OUTPUT, per='revisione', processi=None,
+                 comprimi=None, pattern=PATTERN_CARTELLA, progresso=None, sidecar=False):
+    """Genera tutti i report in parallelo e restituisce il riepilogo"""
+
+    inizio = time.perf_counter()
+    os.makedirs(cartella, exist_ok=True)
+    piano = pianifica_report(trova_file(sorgenti, pattern), per)
+    lavori = [(nome, files, os.path.join(cartella, nome + '.html'), comprimi, sidecar)
+              for nome, files in piano.items()]
+
+    esiti = {}
+
+    def registra(esito):
+        esiti[esito['report']] = esito
+        if progresso:
+            progresso(len(esiti), len(lavori), esito)
+
+    esegui_in_pool(_genera_worker, lavori, processi, registra,
+                   lambda lavoro, errore: {'report': lavoro[0], 'file': lavoro[1], 'output': lavoro[2],
+                                           'errore': errore, 'secondi': 0.0})
+
+    report = [esiti[nome] for nome in piano]
+    return {
+        'report': report,
+        'generati': sum(1 for e in report if not e['errore']),
+        'errori': sum(1 for e in report if e['errore']),
+        'record': sum(e.get('record', 0) for e in report),
+        'byte': sum(e.get('byte', 0) for e in report),
+        'secondi': time.perf_counter() - inizio
+    }
+
+
+def stampa_progresso(completati, totale, esito):
+    """Avanzamento su stderr, così stdout resta JSON"""
+    if esito['errore']:
+        print(f"[{completati}/{totale}] ❌ {esito['report']}: {esito['errore']}", file=sys.stderr)
+    else:
+        print(f"[{completati}/{totale}] ✅ {esito['output']}: {esito['record']} record, "
+              f"{esito['byte'] / 1024:.0f} KiB in {esito['secondi'] * 1000:.0f} ms", file=sys.stderr)
+
+
+def main(argv=None):
+    """Generazione batch da riga di comando con riepilogo JSON su stdout"""
+    parser = argparse.ArgumentParser(description="Genera i report HTML di molti file output_ferri")
+    parser.add_argument('sorgenti', nargs='+', help="Cartelle, glob o file da analizzare")
+    parser.add_argument('--output', default=CARTELLA_OUTPUT, help="Cartella dei report generati")
+    parser.add_argument('--per', choices=('revisione', 'progetto'), default='revisione',
+                        help="Un report per file (revisione) o per progetto")
+    parser.add_argument('--processi', type=int, default=None, help="Numero di processi (default: CPU)")
+    parser.add_argument('--pattern', default=PATTERN_CARTELLA, help="Pattern dei file nelle cartelle")
+    parser.add_argument('--comprimi', choices=('auto', 'si', 'no'), default='auto',
+                        help="Compressione gzip delle colonne nel report")
+    parser.add_argument('--silenzioso', action='store_true', help="Non stampa l'avanzamento")
+    parser.add_argument('--sidecar', action='store_true', help="Salva il sidecar .ferri.bin accanto a ogni file")
+    args = parser.parse_args(argv)
+
+    riepilogo = genera_batch(
+        args.sorgenti,
+        cartella=args.output,
+        per=args.per,
+        processi=args.processi,
+        comprimi={'auto': None, 'si': True, 'no': False}[args.comprimi],
+        pattern=args.pattern,
+        progresso=None if args.silenzioso else stampa_progresso,
+        sidecar=args.sidecar
+    )
+
+    json.dump(riepilogo, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    if riepilogo['errori'] or not riepilogo['report']:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
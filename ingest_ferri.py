@@ -0,0 +1,194 @@
+"""
+Ingest in parallelo di molti file output_ferri.txt
+Accetta cartelle, glob o singoli file, li analizza in un pool di processi
+e unisce i risultati in un unico dataset con le colonne Progetto, File e Data.
+Un file non leggibile viene segnalato senza interrompere gli altri.
+
+Uso:
+    python ingest_ferri.py <cartella|glob|file> [...] [--processi N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from aggregazioni_ferri import AccumulatoreStatistiche
+from dataset_ferri import DatasetFerri, carica_dataset
+from parser_ferri import StatisticheParsing, leggi_intestazione
+
+# Pattern dei file cercati dentro una cartella
+PATTERN_CARTELLA = '*.txt'
+
+
+def trova_file(sorgenti, pattern=PATTERN_CARTELLA):
+    """Espande cartelle e glob nella lista ordinata dei file da analizzare"""
+    if isinstance(sorgenti, str):
+        sorgenti = [sorgenti]
+
+    trovati = []
+    for sorgente in sorgenti:
+        if os.path.isdir(sorgente):
+            trovati.extend(glob.glob(os.path.join(sorgente, '**', pattern), recursive=True))
+        elif os.path.isfile(sorgente):
+            trovati.append(sorgente)
+        else:
+            trovati.extend(p for p in glob.glob(sorgente, recursive=True) if os.path.isfile(p))
+
+    # Rimuove duplicati mantenendo un ordine stabile
+    return sorted({os.path.abspath(p) for p in trovati})
+
+
+def esegui_in_pool(funzione, lavori, processi, registra, fallito):
+    """Chiama registra(funzione(*lavoro)) per ogni lavoro, in un pool di processi se ce n'è più d'uno
+
+    funzione gira nel processo figlio e restituisce gli errori invece di sollevarli;
+    se è il processo figlio a fallire, registra riceve fallito(lavoro, errore).
+    """
+    if processi == 1 or len(lavori) <= 1:
+        for lavoro in lavori:
+            registra(funzione(*lavoro))
+        return
+
+    with ProcessPoolExecutor(max_workers=processi) as pool:
+        futures = {pool.submit(funzione, *lavoro): lavoro for lavoro in lavori}
+        for future in as_completed(futures):
+            try:
+                risultato = future.result()
+            except Exception as e:
+                # Es. processo figlio terminato in modo anomalo
+                risultato = fallito(futures[future], f"{type(e).__name__}: {e}")
+            registra(risultato)
+
+
+def nome_progetto(file_path, intestazione):
+    """Nome del progetto: il file Excel di origine, altrimenti il nome del file"""
+    if intestazione.get('file_excel'):
+        return os.path.splitext(intestazione['file_excel'])[0]
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def ingest_file(file_path, sidecar=False):
+    """Analizza un singolo file e restituisce (dataset, statistiche di parsing)
+
+    Il sidecar .ferri.bin si scrive solo se richiesto: un ingest batch non deve
+    lasciare un file accanto a ogni file dell'archivio.
+    """
+    intestazione = leggi_intestazione(file_path)
+    statistiche = StatisticheParsing()
+    dataset = carica_dataset(file_path, statistiche, sidecar)
+
+    data = intestazione['data'].isoformat() if intestazione['data'] else None
+    dataset.imposta_sorgente(nome_progetto(file_path, intestazione), file_path, data)
+    return dataset, statistiche.as_dict()
+
+
+def _ingest_worker(file_path, sidecar=False):
+    """Eseguito nel processo figlio: gli errori tornano come testo"""
+    inizio = time.perf_counter()
+    try:
+        dataset, statistiche = ingest_file(file_path, sidecar)
+        # Statistiche parziali calcolate qui, poi solo unite nel processo principale
+        accumulatore = AccumulatoreStatistiche.da_dataset(dataset)
+        return file_path, dataset, statistiche, accumulatore, None, time.perf_counter() - inizio
+    except Exception as e:
+        return file_path, None, None, None, f"{type(e).__name__}: {e}", time.perf_counter() - inizio
+
+
+class RisultatoIngest:
+    """Dataset unito più l'esito di ogni singolo file"""
+
+    def __init__(self, dataset, esiti, secondi, statistiche=None):
+        self.dataset = dataset
+        self.esiti = esiti
+        self.secondi = secondi
+        self.statistiche = statistiche if statistiche is not None else AccumulatoreStatistiche()
+
+    @property
+    def errori(self):
+        return [e for e in self.esiti if e['errore']]
+
+    def riepilogo(self):
+        righe = sum(e['righe'] for e in self.esiti)
+        return {
+            'file': len(self.esiti),
+            'errori': len(self.errori),
+            'record': len(self.dataset),
+            'righe': righe,
+            'secondi': self.secondi,
+            'righe_al_secondo': righe / self.secondi if self.secondi > 0 else 0.0,
+            'statistiche': self.statistiche.risultato()
+        }
+
+
+def stampa_progresso(completati, totale, esito):
+    """Callback di progresso predefinito"""
+    if esito['errore']:
+        print(f"[{completati}/{totale}] ❌ {esito['file']}: {esito['errore']}")
+    else:
+        print(f"[{completati}/{totale}] ✅ {esito['file']}: {esito['record']} record "
+              f"in {esito['secondi'] * 1000:.0f} ms")
+
+
+def ingest(sorgenti, processi=None, progresso=stampa_progresso, pattern=PATTERN_CARTELLA, sidecar=False):
+    """Analizza tutti i file in parallelo e li unisce in un unico dataset"""
+    inizio = time.perf_counter()
+    files = trova_file(sorgenti, pattern)
+
+    risultati = {}
+    accumulatori = {}
+    esiti = {}
+
+    def registra(file_path, dataset, statistiche, accumulatore, errore, secondi):
+        esiti[file_path] = {
+            'file': file_path,
+            'record': len(dataset) if dataset is not None else 0,
+            'righe': statistiche['righe'] if statistiche else 0,
+            'secondi': secondi,
+            'errore': errore
+        }
+        if dataset is not None:
+            risultati[file_path] = dataset
+            accumulatori[file_path] = accumulatore
+        if progresso:
+            progresso(len(esiti), len(files), esiti[file_path])
+
+    esegui_in_pool(_ingest_worker, [(f, sidecar) for f in files], processi,
+                   lambda risultato: registra(*risultato),
+                   lambda lavoro, errore: (lavoro[0], None, None, None, errore, 0.0))
+
+    # Unione nell'ordine dei file, indipendente dall'ordine di completamento
+    dataset = DatasetFerri.concatena(risultati[f] for f in files if f in risultati)
+    statistiche = AccumulatoreStatistiche.unisci_tutti(accumulatori.values())
+    return RisultatoIngest(dataset, [esiti[f] for f in files], time.perf_counter() - inizio, statistiche)
+
+
+def main(argv=None):
+    """Ingest da riga di comando con report di avanzamento"""
+    parser = argparse.ArgumentParser(description="Ingest in parallelo di file output_ferri")
+    parser.add_argument('sorgenti', nargs='+', help="Cartelle, glob o file da analizzare")
+    parser.add_argument('--processi', type=int, default=None, help="Numero di processi (default: CPU)")
+    parser.add_argument('--pattern', default=PATTERN_CARTELLA, help="Pattern dei file nelle cartelle")
+    parser.add_argument('--sidecar', action='store_true', help="Salva il sidecar .ferri.bin accanto a ogni file")
+    args = parser.parse_args(argv)
+
+    risultato = ingest(args.sorgenti, processi=args.processi, pattern=args.pattern, sidecar=args.sidecar)
+    riepilogo = risultato.riepilogo()
+
+    print()
+    print(f"📊 {riepilogo['file']} file, {riepilogo['record']} record, "
+          f"{len(risultato.dataset.sorgenti)} sorgenti")
+    if riepilogo['statistiche']:
+        print(f"⚖️  Totale {riepilogo['statistiche']['totale']:,.2f} kg, "
+              f"media {riepilogo['statistiche']['media']:.2f} ± {riepilogo['statistiche']['deviazione_standard']:.2f} kg")
+    print(f"⏱️  {riepilogo['secondi']:.2f} s ({riepilogo['righe_al_secondo']:,.0f} righe/s)")
+    if risultato.errori:
+        print(f"❌ {riepilogo['errori']} file con errori")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Misura del tempo di avvio a freddo di app.py
+Importa l'app in processi Python nuovi (nessun modulo già in cache). Prima viene
+importato streamlit da solo come riferimento: tempo e moduli dell'app sono
+misurati oltre questo riferimento, così le librerie che streamlit carica già
+(plotly compreso) non vengono attribuite all'app. Verifica che i moduli dei
+grafici usati dall'app non vengano caricati all'avvio. Stampa un riepilogo JSON
+ed esce con codice 1 se il budget è superato.
+
+Uso:
+    python misura_avvio.py [--ripetizioni N] [--budget-ms MS] [--dettaglio]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Budget predefinito per l'import di app.py oltre a streamlit (mediana, millisecondi)
+BUDGET_IMPORT_MS = 2000.0
+
+# Moduli che l'app non deve importare all'avvio (oltre a quelli già caricati da streamlit)
+MODULI_DIFFERITI = ('plotly.express',)
+
+# Eseguito nel processo figlio: streamlit come riferimento, poi l'app
+CODICE_MISURA = """
+import json, sys, time
+inizio = time.perf_counter()
+import streamlit
+secondi_streamlit = time.perf_counter() - inizio
+riferimento = set(sys.modules)
+inizio = time.perf_counter()
+import app
+secondi = time.perf_counter() - inizio
+nuovi = set(sys.modules) - riferimento
+differiti = [m for m in {differiti!r} if m in nuovi]
+print(json.dumps({{'secondi': secondi, 'secondi_streamlit': secondi_streamlit, 'moduli': len(sys.modules),
+                  'moduli_app': len(nuovi), 'differiti': differiti}}))
+"""
+
+
+def misura_import(cartella='.', dettaglio=False):
+    """Importa streamlit e poi app.py in un nuovo interprete; restituisce tempi, moduli e import più lenti"""
+    comando = [sys.executable]
+    if dettaglio:
+        comando += ['-X', 'importtime']
+    comando += ['-c', CODICE_MISURA.format(differiti=MODULI_DIFFERITI)]
+
+    inizio = time.perf_counter()
+    processo = subprocess.run(comando, cwd=cartella, capture_output=True, text=True)
+    totale = time.perf_counter() - inizio
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1] if processo.stderr.strip() else
+                           f"codice di uscita {processo.returncode}")
+
+    misura = json.loads(processo.stdout.strip().splitlines()[-1])
+    misura['secondi_processo'] = totale
+    if dettaglio:
+        misura['import_lenti'] = import_piu_lenti(processo.stderr)
+    return misura
+
+
+def import_piu_lenti(testo, quanti=10):
+    """Moduli con il tempo cumulativo più alto dall'output di -X importtime"""
+    tempi = []
+    for riga in testo.splitlines():
+        if not riga.startswith('import time:') or '|' not in riga:
+            continue
+        _, cumulativo, modulo = riga[len('import time:'):].split('|', 2)
+        if cumulativo.strip().isdigit():
+            tempi.append((int(cumulativo) / 1000, modulo.strip()))
+    tempi.sort(reverse=True)
+    return [{'modulo': modulo, 'ms': ms} for ms, modulo in tempi[:quanti]]
+
+
+def misura_avvio(ripetizioni=5, budget_ms=BUDGET_IMPORT_MS, dettaglio=False, cartella=None):
+    """Ripete la misura e confronta la mediana con il budget"""
+    if cartella is None:
+        cartella = os.path.dirname(os.path.abspath(__file__))
+
+    misure = [misura_import(cartella) for _ in range(ripetizioni)]
+    import_ms = [m['secondi'] * 1000 for m in misure]
+    streamlit_ms = [m['secondi_streamlit'] * 1000 for m in misure]
+    processo_ms = [m['secondi_processo'] * 1000 for m in misure]
+    differiti = sorted({modulo for m in misure for modulo in m['differiti']})
+    mediana = statistics.median(import_ms)
+
+    riepilogo = {
+        'ripetizioni': ripetizioni,
+        'import_ms': {'mediana': mediana, 'minimo': min(import_ms), 'massimo': max(import_ms)},
+        'streamlit_ms': {'mediana': statistics.median(streamlit_ms), 'minimo': min(streamlit_ms),
+                         'massimo': max(streamlit_ms)},
+        'processo_ms': {'mediana': statistics.median(processo_ms), 'minimo': min(processo_ms),
+                        'massimo': max(processo_ms)},
+        'moduli': misure[-1]['moduli'],
+        'moduli_app': misure[-1]['moduli_app'],
+        'budget_ms': budget_ms,
+        'entro_budget': mediana <= budget_ms,
+        'moduli_non_differiti': differiti
+    }
+    if dettaglio:
+        riepilogo['import_lenti'] = misura_import(cartella, dettaglio=True)['import_lenti']
+    return riepilogo
+
+
+def main(argv=None):
+    """Misura da riga di comando con riepilogo JSON su stdout"""
+    parser = argparse.ArgumentParser(description="Misura il tempo di avvio a freddo di app.py")
+    parser.add_argument('--ripetizioni', type=int, default=5, help="Numero di processi misurati")
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_IMPORT_MS,
+                        help="Budget per la mediana del tempo di import dell'app oltre a streamlit (ms)")
+    parser.add_argument('--dettaglio', action='store_true', help="Elenca gli import più lenti")
+    args = parser.parse_args(argv)
+
+    riepilogo = misura_avvio(args.ripetizioni, args.budget_ms, args.dettaglio)
+    json.dump(riepilogo, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+    if not riepilogo['entro_budget'] or riepilogo['moduli_non_differiti']:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
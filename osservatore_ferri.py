@@ -0,0 +1,107 @@
+"""
+Osservazione di un file dati con antirimbalzo
+Un thread in background controlla data di modifica e dimensione del file a
+intervalli brevi (una chiamata a os.stat). Un cambiamento viene notificato solo
+quando il file resta invariato per il tempo di attesa: un file copiato o
+riscritto a pezzi produce una sola notifica, a scrittura finita.
+
+Uso:
+    python osservatore_ferri.py [file]
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Intervallo tra due controlli e tempo di stabilità richiesto prima della notifica (secondi)
+INTERVALLO = 0.1
+ATTESA = 0.3
+
+
+def stato_file(file_path):
+    """(mtime_ns, dimensione) del file, oppure None se non esiste"""
+    try:
+        info = os.stat(file_path)
+    except OSError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+class OsservatoreFile:
+    """Chiama al_cambio(file_path) in un thread in background quando il file cambia e poi si stabilizza"""
+
+    def __init__(self, file_path, al_cambio, intervallo=INTERVALLO, attesa=ATTESA):
+        self.file_path = file_path
+        self.al_cambio = al_cambio
+        self.intervallo = intervallo
+        self.attesa = attesa
+        self.cambiamenti = 0
+        self.ultimo_cambio = None
+        self._stato = stato_file(file_path)
+        self._ferma = threading.Event()
+        self._thread = None
+
+    def avvia(self):
+        """Avvia il thread di osservazione (una sola volta)"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._esegui, name=f'osservatore {os.path.basename(self.file_path)}', daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def ferma(self):
+        self._ferma.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _esegui(self):
+        # Stato visto per ultimo e istante da cui non cambia più
+        in_attesa = None
+        while not self._ferma.wait(self.intervallo):
+            stato = stato_file(self.file_path)
+            if stato == self._stato:
+                in_attesa = None
+                continue
+
+            adesso = time.monotonic()
+            if in_attesa is None or in_attesa[0] != stato:
+                # Scrittura ancora in corso: si riparte ad aspettare
+                in_attesa = (stato, adesso)
+                continue
+            if stato is None or adesso - in_attesa[1] < self.attesa:
+                # File rimosso (es. durante una sostituzione) o non ancora stabile
+                continue
+
+            self._stato = stato
+            in_attesa = None
+            self.cambiamenti += 1
+            self.ultimo_cambio = datetime.now()
+            try:
+                self.al_cambio(self.file_path)
+            except Exception as e:
+                # Un errore nella notifica non deve fermare l'osservazione
+                print(f"⚠️ Osservatore {self.file_path}: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    """Stampa una riga per ogni cambiamento del file, fino a Ctrl+C"""
+    argv = sys.argv[1:] if argv is None else argv
+    file_path = argv[0] if argv else 'data/output_ferri.txt'
+
+    osservatore = OsservatoreFile(
+        file_path, lambda path: print(f"🔄 {datetime.now():%H:%M:%S.%f}"[:-3] + f" {path} cambiato")
+    ).avvia()
+    print(f"👀 In osservazione: {file_path} (Ctrl+C per uscire)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        osservatore.ferma()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
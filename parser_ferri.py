@@ -0,0 +1,219 @@
+"""
+Parser condiviso per i file output_ferri.txt
+Legge il file riga per riga e restituisce i record in modo lazy,
+senza caricare l'intero contenuto in memoria. Usa solo la libreria standard
+così può essere importato sia da app.py sia da visualizzatore_semplice.py.
+"""
+
+import hashlib
+import io
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Elementi strutturali riconosciuti
+ELEMENTI_VALIDI = ('PILASTRI', 'TRAVI', 'PARETI', 'FONDAZIONE')
+
+# Pattern precompilati
+SEPARATORE_SEZIONE = '=' * 60
+NOME_SEZIONE_PATTERN = re.compile(r'[A-Z]+')
+RIGA_PATTERN = re.compile(r'(.+?)\s+ø\s*(\d+)\s+([\d.]+)')
+
+# Righe di intestazione del file
+TITOLO_PATTERN = re.compile(r'ANALISI FERRI STRUTTURALI\s*-\s*(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})')
+FILE_EXCEL_PATTERN = re.compile(r'File Excel:\s*(.+?)\s*$')
+
+# Intestazione di sezione cercata direttamente sui byte del file
+INTESTAZIONE_PATTERN = re.compile(rb'^[^\n]*={60}\r?\n([A-Z]+)\r?\n={60}', re.MULTILINE)
+
+# Blocco di sezione: nome, offset in byte [inizio, fine) e checksum del contenuto
+BloccoSezione = namedtuple('BloccoSezione', ['nome', 'inizio', 'fine', 'checksum'])
+
+# Workbook Excel letti direttamente (vedi excel_ferri) e relativo file di layout
+ESTENSIONI_EXCEL = ('.xlsx', '.xlsm')
+SUFFISSO_LAYOUT = '.layout.json'
+
+# Archivi storici SQLite (vedi storico_ferri)
+ESTENSIONI_STORICO = ('.sqlite', '.db')
+
+
+class StatisticheParsing:
+    """Contatori di throughput aggiornati durante la lettura"""
+
+    def __init__(self):
+        self.righe = 0
+        self.record = 0
+        self.secondi = 0.0
+
+    @property
+    def righe_al_secondo(self):
+        if self.secondi <= 0:
+            return 0.0
+        return self.righe / self.secondi
+
+    def as_dict(self):
+        return {
+            'righe': self.righe,
+            'record': self.record,
+            'secondi': self.secondi,
+            'righe_al_secondo': self.righe_al_secondo
+        }
+
+    def __str__(self):
+        return (f"{self.record} record da {self.righe} righe in "
+                f"{self.secondi * 1000:.1f} ms ({self.righe_al_secondo:,.0f} righe/s)")
+
+
+def parse_riga(line):
+    """Estrae (piano, diametro, quantità) da una riga dati, oppure None"""
+
+    # Percorso veloce: split sul simbolo del diametro, senza regex
+    piano, sep, resto = line.partition('ø')
+    if not sep:
+        return None
+
+    parti = resto.split()
+    # Solo cifre e al più un punto: float() accetterebbe anche 1e3, nan, inf, -5 e 1_000
+    if (len(parti) >= 2 and piano[-1:].isspace() and parti[0].isdecimal()
+            and parti[1].replace('.', '', 1).isdecimal()):
+        piano = piano.strip()
+        if piano:
+            return piano, int(parti[0]), float(parti[1])
+
+    # Percorso lento: stessa semantica del vecchio parser
+    match = RIGA_PATTERN.match(line)
+    if match:
+        return match.group(1).strip(), int(match.group(2)), float(match.group(3))
+    return None
+
+
+def e_file_excel(file_path):
+    """True se il file è un workbook Excel invece di un export testuale"""
+    return str(file_path).lower().endswith(ESTENSIONI_EXCEL)
+
+
+def e_file_storico(file_path):
+    """True se il file è un archivio storico SQLite"""
+    return str(file_path).lower().endswith(ESTENSIONI_STORICO)
+
+
+def leggi_intestazione(file_path, max_righe=20):
+    """Legge data di analisi e file Excel di origine dalle prime righe del file"""
+
+    if e_file_excel(file_path):
+        from excel_ferri import leggi_intestazione_excel
+        return leggi_intestazione_excel(file_path)
+
+    intestazione = {'data': None, 'file_excel': None}
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for numero, line in enumerate(file):
+            if numero >= max_righe or line.startswith(SEPARATORE_SEZIONE):
+                break
+
+            match = TITOLO_PATTERN.search(line)
+            if match:
+                intestazione['data'] = datetime.strptime(match.group(1), '%d/%m/%Y %H:%M:%S')
+                continue
+
+            match = FILE_EXCEL_PATTERN.search(line)
+            if match:
+                intestazione['file_excel'] = match.group(1)
+
+    return intestazione
+
+
+def iter_righe_sezioni(lines, statistiche=None):
+    """Generatore di (sezione, riga) che tiene traccia dell'intestazione corrente"""
+
+    if statistiche is None:
+        statistiche = StatisticheParsing()
+
+    sezione = None
+    precedente = None   # riga '=' vista subito prima
+    candidato = None    # nome sezione in attesa della chiusura '='
+
+    for line in lines:
+        statistiche.righe += 1
+        line = line.rstrip('\r\n')
+
+        if candidato is not None:
+            nome, candidato = candidato, None
+            if line.startswith(SEPARATORE_SEZIONE):
+                sezione = nome
+                precedente = None
+                continue
+            # Falso allarme: il nome era una riga normale della sezione
+            yield sezione, nome
+
+        if precedente is not None:
+            precedente = None
+            if NOME_SEZIONE_PATTERN.fullmatch(line):
+                candidato = line
+                continue
+
+        if line.endswith(SEPARATORE_SEZIONE):
+            precedente = line
+
+        yield sezione, line
+
+    if candidato is not None:
+        yield sezione, candidato
+
+
+def iter_record(lines, statistiche=None):
+    """Generatore di record (elemento, piano, diametro, quantità) da righe di testo"""
+
+    if statistiche is None:
+        statistiche = StatisticheParsing()
+    inizio = time.perf_counter()
+
+    try:
+        for sezione, line in iter_righe_sezioni(lines, statistiche):
+            if sezione not in ELEMENTI_VALIDI:
+                continue
+
+            line = line.strip()
+            # Skip linee vuote e separatori
+            if not line or line[0] == '-' or '=' in line:
+                continue
+
+            valori = parse_riga(line)
+            if valori is not None:
+                statistiche.record += 1
+                yield (sezione,) + valori
+    finally:
+        statistiche.secondi += time.perf_counter() - inizio
+
+
+def iter_file(file_path, statistiche=None):
+    """Generatore di record letti in streaming dal file indicato"""
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        yield from iter_record(file, statistiche)
+
+
+def indicizza_sezioni(contenuto):
+    """Divide il contenuto (bytes o mmap) in blocchi di sezione con offset e checksum"""
+
+    inizi = [(None, 0)]
+    for match in INTESTAZIONE_PATTERN.finditer(contenuto):
+        inizi.append((match.group(1).decode('ascii'), match.start()))
+
+    blocchi = []
+    vista = memoryview(contenuto)
+    try:
+        for (nome, inizio), (_, fine) in zip(inizi, inizi[1:] + [(None, len(contenuto))]):
+            if fine > inizio or nome is not None:
+                checksum = hashlib.blake2b(vista[inizio:fine], digest_size=16).hexdigest()
+                blocchi.append(BloccoSezione(nome, inizio, fine, checksum))
+    finally:
+        vista.release()
+    return blocchi
+
+
+def iter_record_blocco(contenuto, blocco, statistiche=None):
+    """Generatore dei record di un singolo blocco di sezione"""
+    testo = bytes(contenuto[blocco.inizio:blocco.fine]).decode('utf-8')
+    return iter_record(io.StringIO(testo, newline=None), statistiche)
@@ -0,0 +1,67 @@
+"""
+Misure di tempo leggere per la dashboard
+Ogni intervallo costa due chiamate a perf_counter e un append: si può lasciare
+sempre attivo. Gli intervalli possono essere annidati e vengono esportati
+come dizionari o JSON.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class RegistroTempi:
+    """Intervalli di tempo di una singola esecuzione, in ordine di inizio"""
+
+    def __init__(self, nome='esecuzione'):
+        self.nome = nome
+        self.data = datetime.now()
+        self.intervalli = []
+        self._inizio = time.perf_counter()
+        self._livello = 0
+        self.secondi = None
+
+    @contextmanager
+    def misura(self, nome):
+        """Misura il blocco with come intervallo con il nome indicato"""
+        intervallo = {'nome': nome, 'livello': self._livello,
+                      'inizio_ms': (time.perf_counter() - self._inizio) * 1000, 'ms': None}
+        self.intervalli.append(intervallo)
+        self._livello += 1
+        inizio = time.perf_counter()
+        try:
+            yield intervallo
+        finally:
+            intervallo['ms'] = (time.perf_counter() - inizio) * 1000
+            self._livello -= 1
+
+    def chiudi(self):
+        """Fissa la durata totale dell'esecuzione"""
+        self.secondi = time.perf_counter() - self._inizio
+        return self
+
+    @property
+    def totale_ms(self):
+        secondi = self.secondi if self.secondi is not None else time.perf_counter() - self._inizio
+        return secondi * 1000
+
+    def as_dict(self):
+        return {
+            'nome': self.nome,
+            'data': self.data.isoformat(timespec='seconds'),
+            'totale_ms': self.totale_ms,
+            'intervalli': [dict(i) for i in self.intervalli]
+        }
+
+    def __str__(self):
+        righe = [f"{self.nome}: {self.totale_ms:.1f} ms"]
+        for i in self.intervalli:
+            durata = f"{i['ms']:.1f} ms" if i['ms'] is not None else "in corso"
+            righe.append(f"{'  ' * (i['livello'] + 1)}{i['nome']}: {durata}")
+        return '\n'.join(righe)
+
+
+def esporta_json(registri):
+    """JSON di una o più esecuzioni"""
+    return json.dumps([r.as_dict() for r in registri], indent=2, ensure_ascii=False)
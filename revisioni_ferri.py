@@ -0,0 +1,270 @@
+"""
+Confronto tra revisioni dell'export dei ferri
+Ogni file viene letto una sola volta e ridotto ai totali in kg per
+(elemento, piano, diametro); le differenze tra due revisioni qualsiasi sono
+poi un hash join tra questi dizionari, senza riparsare i file. Le revisioni
+sono ordinate per la data dell'intestazione 'ANALISI FERRI STRUTTURALI - <data>'
+(data di modifica del file se manca), così la stessa struttura dà anche la
+serie storica su centinaia di revisioni. Confronti e serie hanno senso solo
+tra revisioni dello stesso progetto: una cartella con più edifici si divide
+con per_progetto() o si filtra con --progetto.
+
+Uso:
+    python revisioni_ferri.py <cartella|glob|file> [...] [--progetto NOME] [--da N] [--a N] [--per campo] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from dataset_ferri import carica_dataset, normalizza_selezione
+from ingest_ferri import esegui_in_pool, nome_progetto, trova_file
+from parser_ferri import leggi_intestazione
+
+# Differenze più piccole di così (kg) sono arrotondamenti, non modifiche
+TOLLERANZA = 0.005
+
+# Campi della chiave di confronto
+CHIAVE = ('elemento', 'piano', 'diametro')
+
+
+def totali_revisione(dataset):
+    """Totali in kg per (elemento, piano, diametro), sommati sui codici del dataset"""
+    totali = {}
+    for chiave, quantita in zip(zip(dataset.cod_elemento, dataset.cod_piano, dataset.diametro), dataset.quantita):
+        totali[chiave] = totali.get(chiave, 0.0) + quantita
+
+    elementi, piani = dataset.elementi, dataset.piani
+    return {(elementi[e], piani[p], d): round(kg, 2) for (e, p, d), kg in totali.items()}
+
+
+def leggi_revisione(file_path, sidecar=False):
+    """Legge un file e restituisce la revisione: progetto, data e totali per chiave"""
+    intestazione = leggi_intestazione(file_path)
+    data = intestazione['data'] or datetime.fromtimestamp(os.path.getmtime(file_path)).replace(microsecond=0)
+    return {
+        'file': file_path,
+        'progetto': nome_progetto(file_path, intestazione),
+        'data': data,
+        'totali': totali_revisione(carica_dataset(file_path, sidecar=sidecar))
+    }
+
+
+def _revisione_worker(file_path, sidecar=False):
+    """Eseguito nel processo figlio: gli errori tornano come testo"""
+    try:
+        return file_path, leggi_revisione(file_path, sidecar), None
+    except Exception as e:
+        return file_path, None, f"{type(e).__name__}: {e}"
+
+
+def _seleziona(chiavi, elemento=None, piano=None, diametro=None):
+    """Chiavi che rispettano i filtri (None o 'Tutti' = nessun filtro)"""
+    filtri = [(i, set(valori)) for i, valori in enumerate(map(normalizza_selezione, (elemento, piano, diametro)))
+              if valori is not None]
+    return [chiave for chiave in chiavi if all(chiave[i] in valori for i, valori in filtri)]
+
+
+class SerieRevisioni:
+    """Revisioni ordinate per data, ognuna ridotta ai totali per (elemento, piano, diametro)"""
+
+    def __init__(self, revisioni, errori=None):
+        self.revisioni = sorted(revisioni, key=lambda r: (r['data'], r['file']))
+        self.errori = errori or []
+
+    @classmethod
+    def da_file(cls, sorgenti, processi=None, progresso=None, sidecar=False, progetto=None):
+        """Legge ogni file una volta sola, in parallelo come l'ingest (solo quelli del progetto, se indicato)"""
+        files = trova_file(sorgenti)
+        if progetto is not None:
+            # Basta l'intestazione per sapere il progetto: gli altri file non vengono analizzati
+            files = [f for f in files if nome_progetto(f, leggi_intestazione(f)) == progetto]
+        revisioni = []
+        errori = []
+
+        def registra(risultato):
+            file_path, revisione, errore = risultato
+            if errore:
+                errori.append({'file': file_path, 'errore': errore})
+            else:
+                revisioni.append(revisione)
+            if progresso:
+                progresso(len(revisioni) + len(errori), len(files), file_path, errore)
+
+        esegui_in_pool(_revisione_worker, [(f, sidecar) for f in files], processi, registra,
+                       lambda lavoro, errore: (lavoro[0], None, errore))
+        return cls(revisioni, errori)
+
+    def __len__(self):
+        return len(self.revisioni)
+
+    def progetti(self):
+        """Progetti presenti nella serie, ordinati"""
+        return sorted({revisione['progetto'] for revisione in self.revisioni})
+
+    def per_progetto(self):
+        """Una serie per progetto, in ordine di nome"""
+        gruppi = {}
+        for revisione in self.revisioni:
+            gruppi.setdefault(revisione['progetto'], []).append(revisione)
+        return {progetto: SerieRevisioni(revisioni) for progetto, revisioni in sorted(gruppi.items())}
+
+    def _verifica_progetto(self):
+        """ValueError se la serie mescola progetti diversi: il confronto sarebbe tra edifici diversi"""
+        progetti = self.progetti()
+        if len(progetti) > 1:
+            raise ValueError(f"Revisioni di {len(progetti)} progetti diversi ({', '.join(progetti)}): "
+                             f"usare per_progetto() o filtrare per progetto")
+
+    def chiavi(self, elemento=None, piano=None, diametro=None):
+        """Tutte le chiavi presenti in almeno una revisione, ordinate"""
+        tutte = set()
+        for revisione in self.revisioni:
+            tutte.update(revisione['totali'])
+        return sorted(_seleziona(tutte, elemento, piano, diametro))
+
+    def differenza(self, prima=-2, dopo=-1, tolleranza=TOLLERANZA):
+        """Righe cambiate tra due revisioni (indici nella serie), dalla variazione più grande"""
+        self._verifica_progetto()
+        vecchi = self.revisioni[prima]['totali']
+        nuovi = self.revisioni[dopo]['totali']
+
+        righe = []
+        # Hash join sull'unione delle chiavi: ogni chiave è cercata una volta per lato
+        for chiave in vecchi.keys() | nuovi.keys():
+            kg_prima = vecchi.get(chiave)
+            kg_dopo = nuovi.get(chiave)
+            delta = (kg_dopo or 0.0) - (kg_prima or 0.0)
+            if abs(delta) < tolleranza:
+                continue
+            if kg_prima is None:
+                stato = 'aggiunto'
+            elif kg_dopo is None:
+                stato = 'rimosso'
+            else:
+                stato = 'modificato'
+            righe.append(dict(zip(CHIAVE, chiave), prima=kg_prima or 0.0, dopo=kg_dopo or 0.0,
+                              delta=round(delta, 2), stato=stato))
+
+        righe.sort(key=lambda r: (-abs(r['delta']), r['elemento'], r['piano'], r['diametro']))
+        return righe
+
+    def serie(self, elemento=None, piano=None, diametro=None):
+        """Totale della selezione per ogni revisione, con la variazione rispetto alla precedente"""
+        self._verifica_progetto()
+        chiavi = self.chiavi(elemento, piano, diametro)
+        punti = []
+        precedente = None
+        for revisione in self.revisioni:
+            totali = revisione['totali']
+            totale = round(sum(totali.get(chiave, 0.0) for chiave in chiavi), 2)
+            punti.append({
+                'data': revisione['data'],
+                'file': revisione['file'],
+                'progetto': revisione['progetto'],
+                'totale': totale,
+                'delta': round(totale - precedente, 2) if precedente is not None else None
+            })
+            precedente = totale
+        return punti
+
+    def serie_per_chiave(self, elemento=None, piano=None, diametro=None):
+        """kg di ogni chiave selezionata in ogni revisione (0 se assente), nell'ordine della serie"""
+        self._verifica_progetto()
+        return {chiave: [revisione['totali'].get(chiave, 0.0) for revisione in self.revisioni]
+                for chiave in self.chiavi(elemento, piano, diametro)}
+
+
+def riepiloga_differenza(righe, campo):
+    """Variazione totale per valore di un campo (elemento, piano o diametro)"""
+    riepilogo = {}
+    for riga in righe:
+        riepilogo[riga[campo]] = riepilogo.get(riga[campo], 0.0) + riga['delta']
+    return {valore: round(delta, 2) for valore, delta in sorted(riepilogo.items(), key=lambda v: -abs(v[1]))}
+
+
+def stampa_progresso(completati, totale, file_path, errore):
+    """Callback di progresso predefinito, su stderr"""
+    stato = f"❌ {errore}" if errore else "✅"
+    print(f"[{completati}/{totale}] {stato} {file_path}", file=sys.stderr)
+
+
+def main(argv=None):
+    """Differenze e serie storica da riga di comando"""
+    parser = argparse.ArgumentParser(description="Confronta revisioni dell'export dei ferri")
+    parser.add_argument('sorgenti', nargs='+', help="Cartelle, glob o file delle revisioni")
+    parser.add_argument('--progetto', default=None, help="Solo le revisioni di questo progetto")
+    parser.add_argument('--da', type=int, default=-2, help="Indice della revisione di partenza (default: penultima)")
+    parser.add_argument('--a', type=int, default=-1, help="Indice della revisione di arrivo (default: ultima)")
+    parser.add_argument('--per', choices=CHIAVE, default='elemento', help="Campo del riepilogo delle differenze")
+    parser.add_argument('--limite', type=int, default=20, help="Righe cambiate mostrate")
+    parser.add_argument('--processi', type=int, default=None, help="Numero di processi (default: CPU)")
+    parser.add_argument('--json', action='store_true', help="Stampa il risultato completo in JSON")
+    parser.add_argument('--sidecar', action='store_true', help="Salva il sidecar .ferri.bin accanto a ogni file")
+    args = parser.parse_args(argv)
+
+    inizio = time.perf_counter()
+    serie = SerieRevisioni.da_file(args.sorgenti, args.processi, stampa_progresso, args.sidecar, args.progetto)
+    progetti = serie.progetti()
+    if len(progetti) > 1:
+        print(f"❌ Le revisioni appartengono a {len(progetti)} progetti, sceglierne uno con --progetto:",
+              file=sys.stderr)
+        for progetto in progetti:
+            print(f"   {progetto}", file=sys.stderr)
+        return 1
+    if len(serie) < 2:
+        print("❌ Servono almeno due revisioni leggibili", file=sys.stderr)
+        return 1
+    for opzione, indice in (('--da', args.da), ('--a', args.a)):
+        if not -len(serie) <= indice < len(serie):
+            print(f"❌ {opzione} {indice} fuori intervallo: {len(serie)} revisioni "
+                  f"(indici da 0 a {len(serie) - 1}, oppure negativi dalla fine)", file=sys.stderr)
+            return 1
+
+    differenza = serie.differenza(args.da, args.a)
+    prima, dopo = serie.revisioni[args.da], serie.revisioni[args.a]
+
+    if args.json:
+        json.dump({
+            'revisioni': serie.serie(),
+            'da': prima['file'],
+            'a': dopo['file'],
+            'differenze': differenza,
+            'riepilogo': riepiloga_differenza(differenza, args.per),
+            'errori': serie.errori,
+            'secondi': time.perf_counter() - inizio
+        }, sys.stdout, indent=2, ensure_ascii=False, default=str)
+        print()
+        return 1 if serie.errori else 0
+
+    print("📅 Serie storica:")
+    for punto in serie.serie():
+        delta = f"{punto['delta']:+,.2f} kg" if punto['delta'] is not None else ""
+        print(f"   {punto['data']:%d/%m/%Y %H:%M}  {punto['totale']:>14,.2f} kg  {delta:>16}  "
+              f"{os.path.basename(punto['file'])}")
+
+    print()
+    print(f"🔀 {os.path.basename(prima['file'])} → {os.path.basename(dopo['file'])}: "
+          f"{len(differenza)} righe cambiate")
+    for valore, delta in riepiloga_differenza(differenza, args.per).items():
+        print(f"   {valore!s:<20} {delta:>+14,.2f} kg")
+
+    print()
+    for riga in differenza[:args.limite]:
+        print(f"   {riga['stato']:<10} {riga['elemento']:<11} {riga['piano']:<20} ø{riga['diametro']:<3} "
+              f"{riga['prima']:>12,.2f} → {riga['dopo']:>12,.2f}  {riga['delta']:>+12,.2f} kg")
+    if len(differenza) > args.limite:
+        print(f"   ... altre {len(differenza) - args.limite} righe")
+
+    print(f"⏱️  {len(serie)} revisioni in {time.perf_counter() - inizio:.2f} s")
+    if serie.errori:
+        print(f"❌ {len(serie.errori)} file con errori")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
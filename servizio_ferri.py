@@ -0,0 +1,279 @@
+"""
+Servizio HTTP locale con record, statistiche e raggruppamenti in JSON
+Un solo processo tiene in memoria dataset e cubo di aggregazione, ricaricati
+solo quando cambia il file sorgente, e li condivide tra report, script e
+dashboard. Le risposte hanno un ETag derivato dall'hash del file e dalla
+richiesta: un client che rimanda If-None-Match riceve 304 senza ricalcolo.
+Le risposte più grandi vengono compresse in gzip se il client lo accetta.
+Usa solo la libreria standard e funziona senza rete (ascolta su 127.0.0.1).
+
+Endpoint (filtri ripetibili: ?elemento=TRAVI&diametro=16&diametro=20):
+    /salute                             stato del servizio
+    /statistiche?filtri                 totale, media, estremi, deviazione standard, conteggi
+    /gruppi?per=piano&filtri            aggregati per valore di elemento, piano o diametro
+    /gerarchia?filtri                   albero Elemento → Piano → Diametro con subtotali
+    /record?filtri&inizio=0&limite=100  righe filtrate, a pagine
+
+Uso:
+    python servizio_ferri.py [file] [--host 127.0.0.1] [--porta 8765] [--verboso]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from aggregazioni_ferri import DIMENSIONI, CuboFerri
+from cache_ferri import CacheDati, firma_file
+from dataset_ferri import carica_dataset
+
+# File servito se non indicato
+DATA_FILE = 'data/output_ferri.txt'
+
+# Indirizzo predefinito: solo connessioni locali
+HOST = '127.0.0.1'
+PORTA = 8765
+
+# Risposte più piccole di così non vengono compresse
+SOGLIA_GZIP = 1024
+
+# Righe restituite da /record: predefinite e massime per richiesta
+LIMITE_RECORD = 100
+LIMITE_RECORD_MASSIMO = 100000
+
+
+def _filtri(parametri):
+    """Filtri elemento/piano/diametro dai parametri della query (assenti = Tutti)"""
+    filtri = {'elemento': None, 'piano': None, 'diametro': None}
+    for campo in filtri:
+        valori = parametri.get(campo)
+        if not valori:
+            continue
+        if campo == 'diametro':
+            try:
+                valori = [int(v) for v in valori]
+            except ValueError:
+                raise ValueError(f"Diametro non valido: {', '.join(valori)}") from None
+        filtri[campo] = valori
+    return filtri
+
+
+def _intero(parametri, nome, predefinito, minimo=0, massimo=None):
+    """Parametro intero della query, con limiti"""
+    try:
+        valore = int(parametri.get(nome, [predefinito])[0])
+    except ValueError:
+        raise ValueError(f"Parametro '{nome}' non valido") from None
+    if valore < minimo or (massimo is not None and valore > massimo):
+        raise ValueError(f"Parametro '{nome}' fuori intervallo")
+    return valore
+
+
+def _albero(nodo):
+    """Nodo della gerarchia con i figli come lista, per il JSON"""
+    return {
+        'nome': nodo['nome'],
+        'somma': nodo['somma'],
+        'conteggio': nodo['conteggio'],
+        'figli': [_albero(figlio) for figlio in nodo['figli'].values()]
+    }
+
+
+class ServizioFerri:
+    """Dataset e cubo condivisi tra le richieste, ricaricati solo quando cambia il file"""
+
+    def __init__(self, file_path=DATA_FILE):
+        self.file_path = file_path
+        self._dati = CacheDati()
+        # (firma, cubo) del dataset in cache: il cubo è sempre costruito dallo stesso contenuto
+        self._cubo = None
+        self._lock_cubo = threading.Lock()
+        self.endpoint = {
+            '/statistiche': self.statistiche,
+            '/gruppi': self.gruppi,
+            '/gerarchia': self.gerarchia,
+            '/record': self.record
+        }
+
+    def firma(self):
+        """Hash del contenuto del file sorgente (ricalcolato solo se cambiano mtime o dimensione)"""
+        return firma_file(self.file_path)[2]
+
+    def dati(self):
+        """(firma, dataset, cubo) dello stesso contenuto del file, caricati solo se il file è cambiato"""
+        firma, dataset = self._dati.carica_con_firma(self.file_path, carica_dataset)
+        with self._lock_cubo:
+            if self._cubo is None or self._cubo[0] != firma:
+                self._cubo = (firma, CuboFerri.da_dataset(dataset))
+            return firma[2], dataset, self._cubo[1]
+
+    def statistiche(self, parametri, dataset, cubo):
+        """Statistiche della selezione, con le chiavi di AccumulatoreStatistiche.risultato"""
+        filtri = _filtri(parametri)
+        cella = cubo.cella(**filtri)
+        if cella is None:
+            return None
+        return {
+            'totale': cella['somma'],
+            'media': cella['media'],
+            'massimo': cella['massimo'],
+            'minimo': cella['minimo'],
+            'conteggio': cella['conteggio'],
+            'varianza': cella['varianza'],
+            'deviazione_standard': cella['deviazione_standard'],
+            'elementi_unici': cubo.conteggio_distinti('elemento', **filtri),
+            'piani_unici': cubo.conteggio_distinti('piano', **filtri),
+            'diametri_unici': cubo.conteggio_distinti('diametro', **filtri)
+        }
+
+    def gruppi(self, parametri, dataset, cubo):
+        """Aggregati per valore del campo 'per', rispettando i filtri"""
+        campo = parametri.get('per', ['elemento'])[0]
+        if campo not in DIMENSIONI:
+            raise ValueError(f"Parametro 'per' non valido: {campo}")
+        riepilogo = cubo.riepilogo(campo, **_filtri(parametri))
+        return [dict(cella, **{campo: valore}) for valore, cella in riepilogo.items()]
+
+    def gerarchia(self, parametri, dataset, cubo):
+        """Albero Elemento → Piano → Diametro della selezione"""
+        return _albero(cubo.gerarchia(**_filtri(parametri)))
+
+    def record(self, parametri, dataset, cubo):
+        """Una pagina delle righe filtrate, più il numero totale di righe"""
+        inizio = _intero(parametri, 'inizio', 0)
+        limite = _intero(parametri, 'limite', LIMITE_RECORD, 1, LIMITE_RECORD_MASSIMO)
+        indici = dataset.filtra(**_filtri(parametri))
+        return {
+            'totale': len(indici),
+            'inizio': inizio,
+            'record': [dataset.riga(i) for i in indici[inizio:inizio + limite]]
+        }
+
+
+class GestoreFerri(BaseHTTPRequestHandler):
+    """Richieste GET verso gli endpoint del servizio, con ETag, 304 e gzip"""
+
+    server_version = 'ServizioFerri/1.0'
+    verboso = False
+
+    @property
+    def servizio(self):
+        return self.server.servizio
+
+    def log_message(self, formato, *argomenti):
+        if self.verboso:
+            super().log_message(formato, *argomenti)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/salute':
+            self._invia_json({'stato': 'ok', 'file': self.servizio.file_path})
+            return
+
+        gestore = self.servizio.endpoint.get(url.path)
+        if gestore is None:
+            self._invia_json({'errore': f"Endpoint sconosciuto: {url.path}"}, HTTPStatus.NOT_FOUND)
+            return
+
+        try:
+            # Stesso file e stessa richiesta = stessa risposta: 304 senza caricare né calcolare il corpo
+            etag = self._etag(url, self.servizio.firma())
+        except OSError as e:
+            self._invia_json({'errore': f"File non leggibile: {e}"}, HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        if etag in (v.strip() for v in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self._intestazioni_comuni()
+            self.end_headers()
+            return
+
+        try:
+            # File rimosso o riscritto dopo il controllo dell'ETag, oppure non analizzabile
+            firma, dataset, cubo = self.servizio.dati()
+        except Exception as e:
+            self._invia_json({'errore': f"Dati non disponibili: {type(e).__name__}: {e}"},
+                             HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+
+        try:
+            risultato = gestore(parse_qs(url.query), dataset, cubo)
+        except ValueError as e:
+            self._invia_json({'errore': str(e)}, HTTPStatus.BAD_REQUEST)
+            return
+        # ETag dal contenuto effettivamente usato, che può essere più nuovo di quello controllato sopra
+        self._invia_json(risultato, etag=self._etag(url, firma))
+
+    def _etag(self, url, firma):
+        """ETag debole (uguale con e senza gzip) da hash del file, endpoint e parametri ordinati"""
+        parametri = sorted(parse_qs(url.query).items())
+        chiave = json.dumps([firma, url.path, parametri], separators=(',', ':'))
+        return 'W/"' + hashlib.sha256(chiave.encode('utf-8')).hexdigest()[:32] + '"'
+
+    def _intestazioni_comuni(self):
+        # Report aperti da file:// possono leggere le risposte; la cache va sempre rivalidata
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def _invia_json(self, oggetto, stato=HTTPStatus.OK, etag=None):
+        corpo = json.dumps(oggetto, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        comprimi = len(corpo) >= SOGLIA_GZIP and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if comprimi:
+            corpo = gzip.compress(corpo, compresslevel=6)
+
+        self.send_response(stato)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        if comprimi:
+            self.send_header('Content-Encoding', 'gzip')
+        if etag:
+            self.send_header('ETag', etag)
+        self._intestazioni_comuni()
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def crea_server(file_path=DATA_FILE, host=HOST, porta=PORTA, verboso=False):
+    """Server pronto per serve_forever (porta 0 = porta libera scelta dal sistema)"""
+    server = ThreadingHTTPServer((host, porta), type('Gestore', (GestoreFerri,), {'verboso': verboso}))
+    server.daemon_threads = True
+    server.servizio = ServizioFerri(file_path)
+    return server
+
+
+def main(argv=None):
+    """Avvio del servizio da riga di comando"""
+    parser = argparse.ArgumentParser(description="Servizio JSON locale per i dati dei ferri")
+    parser.add_argument('file', nargs='?', default=DATA_FILE, help="File output_ferri, workbook o archivio .sqlite")
+    parser.add_argument('--host', default=HOST, help="Indirizzo di ascolto")
+    parser.add_argument('--porta', type=int, default=PORTA, help="Porta di ascolto")
+    parser.add_argument('--verboso', action='store_true', help="Registra ogni richiesta su stderr")
+    args = parser.parse_args(argv)
+
+    server = crea_server(args.file, args.host, args.porta, args.verboso)
+
+    # Dati e cubo caricati subito: la prima richiesta trova la cache già calda
+    inizio = time.perf_counter()
+    _, dataset, _ = server.servizio.dati()
+    print(f"✅ {len(dataset)} record da {args.file} in {(time.perf_counter() - inizio) * 1000:.0f} ms")
+    print(f"🌐 In ascolto su http://{server.server_address[0]}:{server.server_address[1]}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Servizio fermato")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
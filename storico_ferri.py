@@ -0,0 +1,361 @@
+"""
+Archivio storico locale delle analisi dei ferri (SQLite)
+Ogni file analizzato diventa un'esecuzione (progetto, file, data, firma del
+contenuto) con le sue righe (elemento, piano, diametro, kg). L'import usa
+l'ingest parallelo e scrive tutto in un'unica transazione; un file già
+importato con lo stesso contenuto viene saltato. Le interrogazioni filtrano e
+aggregano direttamente in SQL, sfruttando gli indici su progetto, data,
+elemento, piano e diametro.
+
+Un archivio (.sqlite/.db) può essere usato al posto di output_ferri.txt da
+app.py e visualizzatore_semplice.py: viene caricata l'esecuzione più recente
+del progetto scelto (obbligatorio se l'archivio ne contiene più di uno).
+
+Uso:
+    python storico_ferri.py importa <archivio.sqlite> <cartella|glob|file> [...] [--processi N]
+    python storico_ferri.py esecuzioni <archivio.sqlite> [--progetto P]
+    python storico_ferri.py aggrega <archivio.sqlite> --per progetto elemento [--elemento E] [--dal DATA] [--al DATA]
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from cache_ferri import hash_file
+from dataset_ferri import DatasetFerri, normalizza_selezione
+from ingest_ferri import PATTERN_CARTELLA, ingest, stampa_progresso, trova_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS esecuzioni (
+    id INTEGER PRIMARY KEY,
+    progetto TEXT NOT NULL,
+    file TEXT NOT NULL,
+    data TEXT,
+    firma TEXT NOT NULL,
+    importato_il TEXT NOT NULL,
+    righe INTEGER NOT NULL,
+    UNIQUE (file, firma)
+);
+CREATE TABLE IF NOT EXISTS ferri (
+    esecuzione INTEGER NOT NULL REFERENCES esecuzioni (id) ON DELETE CASCADE,
+    elemento TEXT NOT NULL,
+    piano TEXT NOT NULL,
+    diametro INTEGER NOT NULL,
+    quantita REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_esecuzioni_progetto ON esecuzioni (progetto, data);
+CREATE INDEX IF NOT EXISTS idx_esecuzioni_data ON esecuzioni (data);
+CREATE INDEX IF NOT EXISTS idx_ferri_esecuzione ON ferri (esecuzione);
+CREATE INDEX IF NOT EXISTS idx_ferri_elemento ON ferri (elemento);
+CREATE INDEX IF NOT EXISTS idx_ferri_piano ON ferri (piano);
+CREATE INDEX IF NOT EXISTS idx_ferri_diametro ON ferri (diametro);
+"""
+
+# Campi per cui si può raggruppare, con la colonna SQL corrispondente
+CAMPI_AGGREGAZIONE = {
+    'progetto': 'e.progetto',
+    'data': 'e.data',
+    'esecuzione': 'e.id',
+    'elemento': 'f.elemento',
+    'piano': 'f.piano',
+    'diametro': 'f.diametro'
+}
+
+# Misure calcolate da SQLite per ogni gruppo, sulle righe di _sql_misure: il momento secondo
+# somma gli scarti dalla media del gruppo (due passate), non Σq² − n·media² che perde cifre
+MISURE = "SUM(q), COUNT(*), MIN(q), MAX(q), SUM((q - media) * (q - media))"
+
+
+def _limite_data(valore, fine=False):
+    """Condizione su e.data per un estremo ISO; una data senza ora comprende tutto il giorno"""
+    testo = valore.isoformat() if isinstance(valore, (date, datetime)) else str(valore).strip()
+    if len(testo) == 10:
+        giorno = date.fromisoformat(testo)
+        if fine:
+            return "e.data < ?", (giorno + timedelta(days=1)).isoformat()
+        return "e.data >= ?", giorno.isoformat()
+    # Data e ora nello stesso formato salvato (separatore 'T')
+    testo = datetime.fromisoformat(testo).isoformat()
+    return ("e.data <= ?" if fine else "e.data >= ?"), testo
+
+
+def _condizioni(elemento=None, piano=None, diametro=None, progetto=None, esecuzione=None, dal=None, al=None):
+    """Clausola WHERE e parametri per i filtri (None o 'Tutti' = nessun filtro)"""
+    clausole = []
+    parametri = []
+    for colonna, selezione in (('f.elemento', elemento), ('f.piano', piano), ('f.diametro', diametro),
+                               ('e.progetto', progetto), ('e.id', esecuzione)):
+        valori = normalizza_selezione(selezione)
+        if valori is not None:
+            clausole.append(f"{colonna} IN ({', '.join('?' * len(valori))})")
+            parametri.extend(valori)
+    # Date ISO: il confronto tra stringhe rispetta l'ordine cronologico
+    for valore, fine in ((dal, False), (al, True)):
+        if valore is not None:
+            clausola, parametro = _limite_data(valore, fine)
+            clausole.append(clausola)
+            parametri.append(parametro)
+    return (' WHERE ' + ' AND '.join(clausole)) if clausole else '', parametri
+
+
+def _sql_misure(colonne, where, altre=''):
+    """SELECT delle MISURE per gruppo di colonne; la sottoquery dà a ogni riga la media del suo gruppo"""
+    alias = [f'g{i}' for i in range(len(colonne))]
+    gruppo = ', '.join(alias)
+    partizione = ', '.join(colonne)
+    sql = (f"SELECT {gruppo + ', ' if gruppo else ''}{MISURE}{altre} FROM ("
+           f"SELECT {''.join(f'{c} AS {a}, ' for c, a in zip(colonne, alias))}"
+           f"f.elemento AS elemento, f.piano AS piano, f.diametro AS diametro, f.quantita AS q, "
+           f"AVG(f.quantita) OVER ({'PARTITION BY ' + partizione if partizione else ''}) AS media "
+           f"FROM ferri f JOIN esecuzioni e ON e.id = f.esecuzione{where})")
+    if gruppo:
+        sql += f" GROUP BY {gruppo} ORDER BY {gruppo}"
+    return sql
+
+
+def _misure(somma, conteggio, minimo, massimo, m2):
+    """Somma, conteggio, estremi, media e varianza (di popolazione) di un gruppo"""
+    media = somma / conteggio
+    return {
+        'somma': somma,
+        'conteggio': conteggio,
+        'minimo': minimo,
+        'massimo': massimo,
+        'media': media,
+        'varianza': m2 / conteggio,
+        'm2': m2
+    }
+
+
+class StoricoFerri:
+    """Archivio SQLite delle esecuzioni, con import in blocco e interrogazioni aggregate in SQL"""
+
+    def __init__(self, percorso):
+        self.percorso = percorso
+        self.connessione = sqlite3.connect(percorso)
+        self.connessione.execute("PRAGMA foreign_keys = ON")
+        self.connessione.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *errore):
+        self.chiudi()
+
+    def chiudi(self):
+        self.connessione.close()
+
+    def _gia_importato(self, file_path, firma):
+        riga = self.connessione.execute(
+            "SELECT 1 FROM esecuzioni WHERE file = ? AND firma = ?", (file_path, firma)
+        ).fetchone()
+        return riga is not None
+
+    def importa(self, sorgenti, processi=None, progresso=stampa_progresso, pattern=PATTERN_CARTELLA, sidecar=False):
+        """Analizza i file nuovi o cambiati e li salva in un'unica transazione; restituisce un riepilogo"""
+        inizio = time.perf_counter()
+        files = trova_file(sorgenti, pattern)
+        firme = {file_path: hash_file(file_path) for file_path in files}
+        nuovi = [file_path for file_path in files if not self._gia_importato(file_path, firme[file_path])]
+
+        esiti = []
+        righe = 0
+        if nuovi:
+            risultato = ingest(nuovi, processi=processi, progresso=progresso, pattern=pattern, sidecar=sidecar)
+            esiti = risultato.esiti
+            dataset = risultato.dataset
+            importato_il = datetime.now().isoformat(timespec='seconds')
+
+            # Righe per sorgente, contate una volta sola sulla colonna dei codici
+            righe_sorgente = [0] * len(dataset.sorgenti)
+            for codice in dataset.cod_sorgente:
+                righe_sorgente[codice] += 1
+
+            with self.connessione:
+                id_esecuzioni = []
+                for sorgente, conteggio in zip(dataset.sorgenti, righe_sorgente):
+                    cursore = self.connessione.execute(
+                        "INSERT INTO esecuzioni (progetto, file, data, firma, importato_il, righe) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (sorgente['progetto'], sorgente['file'], sorgente['data'], firme[sorgente['file']],
+                         importato_il, conteggio)
+                    )
+                    id_esecuzioni.append(cursore.lastrowid)
+
+                elementi, piani = dataset.elementi, dataset.piani
+                self.connessione.executemany(
+                    "INSERT INTO ferri (esecuzione, elemento, piano, diametro, quantita) VALUES (?, ?, ?, ?, ?)",
+                    ((id_esecuzioni[s], elementi[e], piani[p], d, q)
+                     for s, e, p, d, q in zip(dataset.cod_sorgente, dataset.cod_elemento, dataset.cod_piano,
+                                              dataset.diametro, dataset.quantita))
+                )
+            righe = len(dataset)
+
+        return {
+            'file': len(files),
+            'importati': sum(1 for e in esiti if not e['errore']),
+            'saltati': len(files) - len(nuovi),
+            'errori': [e for e in esiti if e['errore']],
+            'righe': righe,
+            'secondi': time.perf_counter() - inizio
+        }
+
+    def esecuzioni(self, progetto=None, dal=None, al=None):
+        """Esecuzioni archiviate, dalla più recente"""
+        where, parametri = _condizioni(progetto=progetto, dal=dal, al=al)
+        cursore = self.connessione.execute(
+            f"SELECT e.id, e.progetto, e.file, e.data, e.righe, e.importato_il FROM esecuzioni e{where} "
+            "ORDER BY e.data DESC, e.id DESC", parametri
+        )
+        campi = ('id', 'progetto', 'file', 'data', 'righe', 'importato_il')
+        return [dict(zip(campi, riga)) for riga in cursore]
+
+    def progetti(self):
+        """Nomi dei progetti archiviati"""
+        return [riga[0] for riga in self.connessione.execute(
+            "SELECT DISTINCT progetto FROM esecuzioni ORDER BY progetto")]
+
+    def ultima_esecuzione(self, progetto=None):
+        """Id dell'esecuzione più recente (del progetto, se indicato), oppure None"""
+        esecuzioni = self.esecuzioni(progetto)
+        return esecuzioni[0]['id'] if esecuzioni else None
+
+    def scegli_progetto(self, progetto=None):
+        """Progetto da caricare: quello indicato, oppure l'unico archiviato (ValueError se ambiguo o assente)"""
+        progetti = self.progetti()
+        if progetto is not None:
+            if progetto not in progetti:
+                raise ValueError(f"Progetto '{progetto}' non presente nell'archivio (progetti: {', '.join(progetti)})")
+            return progetto
+        if len(progetti) > 1:
+            raise ValueError(f"L'archivio contiene {len(progetti)} progetti ({', '.join(progetti)}): indicare quale caricare")
+        return progetti[0] if progetti else None
+
+    def aggrega(self, per=('elemento',), **filtri):
+        """Misure per gruppo calcolate in SQL, come lista di dizionari ordinata per i campi di raggruppamento"""
+        if isinstance(per, str):
+            per = (per,)
+        colonne = [CAMPI_AGGREGAZIONE[campo] for campo in per]
+        where, parametri = _condizioni(**filtri)
+
+        risultati = []
+        for riga in self.connessione.execute(_sql_misure(colonne, where), parametri):
+            chiave, misure = riga[:len(per)], riga[len(per):]
+            if not misure[1]:
+                continue
+            risultati.append(dict(zip(per, chiave), **_misure(*misure)))
+        return risultati
+
+    def statistiche(self, **filtri):
+        """Statistiche con le stesse chiavi di AccumulatoreStatistiche.risultato, oppure None se vuoto"""
+        where, parametri = _condizioni(**filtri)
+        riga = self.connessione.execute(
+            _sql_misure([], where, ", COUNT(DISTINCT elemento), COUNT(DISTINCT piano), COUNT(DISTINCT diametro)"),
+            parametri
+        ).fetchone()
+        if not riga[1]:
+            return None
+        misure = _misure(*riga[:5])
+        return {
+            'totale': misure['somma'],
+            'media': misure['media'],
+            'massimo': misure['massimo'],
+            'minimo': misure['minimo'],
+            'conteggio': misure['conteggio'],
+            'varianza': misure['varianza'],
+            'deviazione_standard': math.sqrt(misure['varianza']),
+            'elementi_unici': riga[5],
+            'piani_unici': riga[6],
+            'diametri_unici': riga[7]
+        }
+
+    def celle_cubo(self, **filtri):
+        """Celle base per CuboFerri.da_celle (con momento secondo), aggregate in SQL"""
+        return [(c['elemento'], c['piano'], c['diametro'], c['somma'], c['conteggio'],
+                 c['minimo'], c['massimo'], c['m2'])
+                for c in self.aggrega(('elemento', 'piano', 'diametro'), **filtri)]
+
+    def dataset(self, esecuzione=None, progetto=None, **filtri):
+        """Righe di un'esecuzione come DatasetFerri (default: la più recente, del progetto se indicato)"""
+        if esecuzione is None:
+            esecuzione = self.ultima_esecuzione(progetto)
+        dataset = DatasetFerri()
+        if esecuzione is None:
+            return dataset
+
+        where, parametri = _condizioni(esecuzione=esecuzione, **filtri)
+        dataset.estendi(self.connessione.execute(
+            f"SELECT f.elemento, f.piano, f.diametro, f.quantita "
+            f"FROM ferri f JOIN esecuzioni e ON e.id = f.esecuzione{where} ORDER BY f.rowid", parametri
+        ))
+        progetto, file, data = self.connessione.execute(
+            "SELECT progetto, file, data FROM esecuzioni WHERE id = ?", (esecuzione,)
+        ).fetchone()
+        dataset.imposta_sorgente(progetto, file, data)
+        return dataset
+
+
+def carica_storico(file_path, progetto=None):
+    """Dataset dell'esecuzione più recente di un progetto dell'archivio, come sorgente dati al posto del testo"""
+    with StoricoFerri(file_path) as storico:
+        return storico.dataset(progetto=storico.scegli_progetto(progetto))
+
+
+def main(argv=None):
+    """Import e interrogazioni da riga di comando"""
+    parser = argparse.ArgumentParser(description="Archivio storico SQLite delle analisi dei ferri")
+    comandi = parser.add_subparsers(dest='comando', required=True)
+
+    importa = comandi.add_parser('importa', help="Importa file output_ferri nell'archivio")
+    importa.add_argument('archivio', help="File SQLite dell'archivio")
+    importa.add_argument('sorgenti', nargs='+', help="Cartelle, glob o file da importare")
+    importa.add_argument('--processi', type=int, default=None, help="Numero di processi (default: CPU)")
+    importa.add_argument('--pattern', default=PATTERN_CARTELLA, help="Pattern dei file nelle cartelle")
+    importa.add_argument('--sidecar', action='store_true', help="Salva il sidecar .ferri.bin accanto a ogni file")
+
+    esecuzioni = comandi.add_parser('esecuzioni', help="Elenca le esecuzioni archiviate")
+    esecuzioni.add_argument('archivio', help="File SQLite dell'archivio")
+    esecuzioni.add_argument('--progetto', default=None, help="Solo le esecuzioni di un progetto")
+
+    aggrega = comandi.add_parser('aggrega', help="Totali per gruppo calcolati in SQL")
+    aggrega.add_argument('archivio', help="File SQLite dell'archivio")
+    aggrega.add_argument('--per', nargs='*', choices=list(CAMPI_AGGREGAZIONE), default=['progetto', 'elemento'],
+                         help="Campi di raggruppamento")
+    for campo in ('progetto', 'elemento', 'piano'):
+        aggrega.add_argument(f'--{campo}', action='append', default=None, help=f"Filtro su {campo} (ripetibile)")
+    aggrega.add_argument('--diametro', type=int, action='append', default=None, help="Filtro sul diametro (ripetibile)")
+    aggrega.add_argument('--esecuzione', type=int, action='append', default=None, help="Filtro sull'esecuzione")
+    aggrega.add_argument('--dal', default=None, help="Data minima (ISO, es. 2025-01-31, giorno compreso)")
+    aggrega.add_argument('--al', default=None, help="Data massima (ISO, giorno compreso)")
+    args = parser.parse_args(argv)
+
+    if args.comando != 'importa' and not os.path.exists(args.archivio):
+        print(f"❌ Archivio non trovato: {args.archivio}", file=sys.stderr)
+        return 1
+
+    with StoricoFerri(args.archivio) as storico:
+        if args.comando == 'importa':
+            riepilogo = storico.importa(args.sorgenti, args.processi, pattern=args.pattern, sidecar=args.sidecar)
+            print(f"💾 {riepilogo['importati']} file importati ({riepilogo['righe']} righe), "
+                  f"{riepilogo['saltati']} già presenti, in {riepilogo['secondi']:.2f} s")
+            if riepilogo['errori']:
+                print(f"❌ {len(riepilogo['errori'])} file con errori")
+                return 1
+        elif args.comando == 'esecuzioni':
+            for e in storico.esecuzioni(args.progetto):
+                print(f"{e['id']:>5}  {e['data'] or '-':<19}  {e['progetto']:<30} {e['righe']:>8} righe  {e['file']}")
+        else:
+            filtri = {campo: getattr(args, campo)
+                      for campo in ('progetto', 'elemento', 'piano', 'diametro', 'esecuzione', 'dal', 'al')}
+            json.dump(storico.aggrega(args.per, **filtri), sys.stdout, indent=2, ensure_ascii=False)
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
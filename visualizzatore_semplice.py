@@ -3,544 +3,247 @@ Visualizzatore Ferri Strutturali - Versione Semplificata
 Questa versione usa solo librerie standard Python e genera un report HTML
 """
 
-import re
+import base64
+import html
+import io
 import json
+import re
+import sys
+import zlib
+from array import array
 from datetime import datetime
+from functools import lru_cache
 import webbrowser
 import os
 
-def parse_ferri_data(file_path):
+from aggregazioni_ferri import AccumulatoreStatistiche, CuboFerri
+from dataset_ferri import carica_dataset
+from parser_ferri import StatisticheParsing, e_file_storico
+
+# Oltre questa dimensione (byte) le colonne del report vengono compresse con gzip
+SOGLIA_COMPRESSIONE = 64 * 1024
+
+# Righe per blocco quando le colonne vengono scritte nel report
+BLOCCO_REPORT = 1 << 16
+
+# Statistiche di un export senza righe di dati (solo intestazione)
+STATISTICHE_VUOTE = {
+    'totale': 0.0, 'media': 0.0, 'massimo': 0.0, 'minimo': 0.0, 'conteggio': 0,
+    'varianza': 0.0, 'deviazione_standard': 0.0, 'elementi_unici': 0, 'piani_unici': 0, 'diametri_unici': 0
+}
+
+# Template del report e segnaposto {{ nome }} al suo interno
+TEMPLATE_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'report_ferri.html')
+SEGNAPOSTO_PATTERN = re.compile(r'\{\{ (\w+) \}\}')
+
+def parse_ferri_data(file_path, statistiche=None, progetto=None):
     """Parser per leggere e strutturare i dati dal file di output"""
     
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    data = []
-    
-    # Pattern per identificare le sezioni
-    element_pattern = r'={60}\n([A-Z]+)\n={60}'
-    
-    # Trova tutte le sezioni
-    sections = re.split(element_pattern, content)
-    
-    for i in range(1, len(sections), 2):
-        element_type = sections[i].strip()
-        element_content = sections[i+1] if i+1 < len(sections) else ""
-        
-        if element_type in ['PILASTRI', 'TRAVI', 'PARETI', 'FONDAZIONE']:
-            # Parse delle righe di dati
-            lines = element_content.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                # Skip linee vuote e separatori
-                if not line or line.startswith('-') or '=' in line:
-                    continue
-                
-                # Pattern per estrarre piano, diametro e quantità
-                match = re.match(r'(.+?)\s+ø\s*(\d+)\s+([\d.]+)', line)
-                if match:
-                    piano = match.group(1).strip()
-                    diametro = int(match.group(2))
-                    quantita = float(match.group(3))
-                    
-                    data.append({
-                        'elemento': element_type,
-                        'piano': piano,
-                        'diametro': diametro,
-                        'quantita': quantita
-                    })
-    
-    return data
+    if e_file_storico(file_path):
+        # Ultima esecuzione del progetto indicato (obbligatorio se l'archivio ne ha più di uno)
+        from storico_ferri import carica_storico
+        return carica_storico(file_path, progetto)
+    return carica_dataset(file_path, statistiche)
 
 def calculate_statistics(data, filters=None):
     """Calcola statistiche sui dati filtrati"""
     
-    filtered_data = data
+    filtri = {}
     
     if filters:
-        if filters.get('elemento') and filters['elemento'] != 'Tutti':
-            filtered_data = [d for d in filtered_data if d['elemento'] == filters['elemento']]
-        
-        if filters.get('piano') and filters['piano'] != 'Tutti':
-            filtered_data = [d for d in filtered_data if d['piano'] == filters['piano']]
-        
-        if filters.get('diametro') and filters['diametro'] != 'Tutti':
-            filtered_data = [d for d in filtered_data if d['diametro'] == int(filters['diametro'])]
+        # Ogni filtro può essere un valore, una lista di valori (OR) oppure 'Tutti'
+        for campo in ('elemento', 'piano', 'diametro'):
+            filtri[campo] = filters.get(campo)
+    
+    # Risolto sugli indici posizionali del dataset
+    righe = data.filtra(**filtri)
+    filtered_data = data if isinstance(righe, range) else data.seleziona(righe)
     
     if not filtered_data:
         return None
     
-    quantita_list = [d['quantita'] for d in filtered_data]
-    
-    stats = {
-        'totale': sum(quantita_list),
-        'media': sum(quantita_list) / len(quantita_list),
-        'massimo': max(quantita_list),
-        'minimo': min(quantita_list),
-        'conteggio': len(filtered_data),
-        'elementi_unici': len(set(d['elemento'] for d in filtered_data)),
-        'piani_unici': len(set(d['piano'] for d in filtered_data)),
-        'diametri_unici': len(set(d['diametro'] for d in filtered_data))
-    }
+    # Una sola passata per tutte le statistiche, varianza compresa
+    stats = AccumulatoreStatistiche.da_dataset(filtered_data).risultato()
     
     return stats, filtered_data
 
 def group_by_field(data, field):
     """Raggruppa i dati per un campo specifico"""
-    groups = {}
-    for item in data:
-        key = item[field]
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(item['quantita'])
+    return data.raggruppa(field)
+
+def _layout_colonne(data):
+    """Colonne del payload (nome, tipo JS, typecode, valori) con offset allineati nel blob"""
     
-    # Calcola totali per gruppo
-    result = {}
-    for key, values in groups.items():
-        result[key] = sum(values)
+    colonne = []
+    offset = 0
+    for nome, tipo, typecode, valori in (
+        ('elemento', 'Uint8', 'B', data.cod_elemento),
+        ('piano', 'Uint16', 'H', data.cod_piano),
+        ('diametro', 'Uint8', 'B', data.diametro),
+        ('quantita', 'Float64', 'd', data.quantita)
+    ):
+        # Le viste tipizzate JavaScript richiedono offset allineati (8 byte per i Float64)
+        offset += -offset % array(typecode).itemsize
+        lunghezza = len(valori) * array(typecode).itemsize
+        colonne.append({'nome': nome, 'tipo': tipo, 'typecode': typecode, 'valori': valori,
+                        'offset': offset, 'lunghezza': lunghezza})
+        offset += lunghezza
+    return colonne, offset
+
+def _iter_blob(colonne):
+    """Byte del blob colonnare (little endian), a blocchi di BLOCCO_REPORT righe"""
     
-    return result
+    posizione = 0
+    for colonna in colonne:
+        yield b'\0' * (colonna['offset'] - posizione)
+        valori = memoryview(colonna['valori']).cast('B')
+        passo = BLOCCO_REPORT * array(colonna['typecode']).itemsize
+        for inizio in range(0, len(valori), passo):
+            blocco = array(colonna['typecode'], bytes(valori[inizio:inizio + passo]))
+            if sys.byteorder == 'big':
+                blocco.byteswap()
+            yield blocco.tobytes()
+        posizione = colonna['offset'] + colonna['lunghezza']
 
-def generate_html_report(data):
-    """Genera un report HTML interattivo"""
+def _iter_gzip(blocchi):
+    """Comprime in streaming in formato gzip (compatibile con DecompressionStream)"""
     
-    # Ottieni liste uniche per i filtri
-    elementi = sorted(list(set(d['elemento'] for d in data)))
-    piani = sorted(list(set(d['piano'] for d in data)))
-    diametri = sorted(list(set(d['diametro'] for d in data)))
+    compressore = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for blocco in blocchi:
+        yield compressore.compress(blocco)
+    yield compressore.flush()
+
+def _iter_base64(blocchi):
+    """Codifica base64 in streaming, spezzando solo su multipli di 3 byte"""
     
-    # Calcola statistiche globali
-    stats, _ = calculate_statistics(data)
+    resto = b''
+    for blocco in blocchi:
+        resto += blocco
+        taglio = len(resto) - len(resto) % 3
+        if taglio:
+            yield base64.b64encode(resto[:taglio]).decode('ascii')
+            resto = resto[taglio:]
+    if resto:
+        yield base64.b64encode(resto).decode('ascii')
+
+def celle_gerarchia(data):
+    """Celle base del cubo come [codice elemento, codice piano, diametro, somma, conteggio] per il drill-down"""
     
-    # Prepara dati per i grafici
-    element_data = group_by_field(data, 'elemento')
-    piano_data = group_by_field(data, 'piano')
-    diametro_data = group_by_field(data, 'diametro')
+    cubo = CuboFerri.da_dataset(data)
+    codici_elemento = {nome: codice for codice, nome in enumerate(data.elementi)}
+    codici_piano = {nome: codice for codice, nome in enumerate(data.piani)}
+    return [
+        [codici_elemento[elemento], codici_piano[piano], diametro,
+         round(cubo.celle[elemento, piano, diametro][0], 2), cubo.celle[elemento, piano, diametro][1]]
+        for elemento, piano, diametro in cubo.chiavi_base
+    ]
+
+def _iter_payload(data, stats, comprimi=None):
+    """Payload JSON del report a pezzi: il base64 delle colonne non è mai in memoria per intero"""
     
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="it">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🏗️ Visualizzatore Ferri Strutturali</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background-color: #f5f5f5;
-            color: #333;
-        }}
-        
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 10px;
-            margin-bottom: 30px;
-            text-align: center;
-        }}
-        
-        .filters {{
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 30px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        
-        .filter-group {{
-            display: inline-block;
-            margin: 10px 15px 10px 0;
-        }}
-        
-        .filter-group label {{
-            display: block;
-            margin-bottom: 5px;
-            font-weight: bold;
-            color: #555;
-        }}
-        
-        .filter-group select {{
-            padding: 8px 12px;
-            border: 2px solid #ddd;
-            border-radius: 5px;
-            font-size: 14px;
-            min-width: 150px;
-        }}
-        
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }}
-        
-        .stat-card {{
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            text-align: center;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        
-        .stat-value {{
-            font-size: 2em;
-            font-weight: bold;
-            color: #667eea;
-        }}
-        
-        .stat-label {{
-            color: #666;
-            margin-top: 5px;
-        }}
-        
-        .charts-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(400px, 1fr));
-            gap: 30px;
-            margin-bottom: 30px;
-        }}
-        
-        .chart-container {{
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        
-        .data-table {{
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            margin-bottom: 30px;
-        }}
-        
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-        }}
-        
-        th, td {{
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #ddd;
-        }}
-        
-        th {{
-            background-color: #f8f9fa;
-            font-weight: bold;
-        }}
-        
-        .footer {{
-            text-align: center;
-            color: #666;
-            margin-top: 30px;
-        }}
-        
-        .hidden {{
-            display: none;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🏗️ Visualizzatore Ferri Strutturali</h1>
-            <p>Analisi interattiva dei dati strutturali</p>
-        </div>
-        
-        <div class="filters">
-            <h3>🔍 Filtri</h3>
-            <div class="filter-group">
-                <label for="elemento-filter">Elemento Strutturale:</label>
-                <select id="elemento-filter" onchange="applyFilters()">
-                    <option value="Tutti">Tutti</option>
-                    {''.join(f'<option value="{elem}">{elem}</option>' for elem in elementi)}
-                </select>
-            </div>
-            
-            <div class="filter-group">
-                <label for="piano-filter">Piano:</label>
-                <select id="piano-filter" onchange="applyFilters()">
-                    <option value="Tutti">Tutti</option>
-                    {''.join(f'<option value="{piano}">{piano}</option>' for piano in piani)}
-                </select>
-            </div>
-            
-            <div class="filter-group">
-                <label for="diametro-filter">Diametro (mm):</label>
-                <select id="diametro-filter" onchange="applyFilters()">
-                    <option value="Tutti">Tutti</option>
-                    {''.join(f'<option value="{diam}">{diam} mm</option>' for diam in diametri)}
-                </select>
-            </div>
-        </div>
-        
-        <div class="stats-grid" id="stats-container">
-            <div class="stat-card">
-                <div class="stat-value" id="total-weight">{stats['totale']:.2f}</div>
-                <div class="stat-label">Peso Totale (kg)</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value" id="avg-weight">{stats['media']:.2f}</div>
-                <div class="stat-label">Peso Medio (kg)</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value" id="max-weight">{stats['massimo']:.2f}</div>
-                <div class="stat-label">Peso Massimo (kg)</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value" id="min-weight">{stats['minimo']:.2f}</div>
-                <div class="stat-label">Peso Minimo (kg)</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value" id="total-count">{stats['conteggio']}</div>
-                <div class="stat-label">Righe Totali</div>
-            </div>
-        </div>
-        
-        <div class="charts-grid">
-            <div class="chart-container">
-                <h3>Distribuzione per Elemento</h3>
-                <canvas id="elementChart"></canvas>
-            </div>
-            <div class="chart-container">
-                <h3>Distribuzione per Piano</h3>
-                <canvas id="pianoChart"></canvas>
-            </div>
-            <div class="chart-container">
-                <h3>Distribuzione per Diametro</h3>
-                <canvas id="diametroChart"></canvas>
-            </div>
-            <div class="chart-container">
-                <h3>Distribuzione Percentuale</h3>
-                <canvas id="pieChart"></canvas>
-            </div>
-        </div>
-        
-        <div class="data-table">
-            <h3>📊 Dati Filtrati</h3>
-            <table id="data-table">
-                <thead>
-                    <tr>
-                        <th>Elemento</th>
-                        <th>Piano</th>
-                        <th>Diametro (mm)</th>
-                        <th>Quantità (kg)</th>
-                    </tr>
-                </thead>
-                <tbody id="table-body">
-                </tbody>
-            </table>
-        </div>
-        
-        <div class="footer">
-            <p><strong>Fonte dati:</strong> output_ferri.txt</p>
-            <p><strong>Generato il:</strong> {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</p>
-        </div>
-    </div>
+    colonne, dimensione = _layout_colonne(data)
+    if comprimi is None:
+        comprimi = dimensione > SOGLIA_COMPRESSIONE
+    
+    testa = {
+        'righe': len(data),
+        'dizionari': {'elemento': data.elementi, 'piano': data.piani},
+        'colonne': [{k: c[k] for k in ('nome', 'tipo', 'offset', 'lunghezza')} for c in colonne],
+        'compresso': comprimi,
+        'aggregati': {
+            'statistiche': stats,
+            'gruppi': {campo: group_by_field(data, campo) for campo in ('elemento', 'piano', 'diametro')},
+            # Subtotali di ogni (elemento, piano, diametro): l'albero del drill-down si costruisce da qui
+            'celle': celle_gerarchia(data)
+        }
+    }
+    
+    blocchi = _iter_blob(colonne)
+    if comprimi:
+        blocchi = _iter_gzip(blocchi)
+    
+    # 'dati' per ultimo, così la stringa base64 può essere scritta in streaming
+    yield json.dumps(testa, separators=(',', ':'))[:-1].replace('</', '<\\/') + ',"dati":"'
+    yield from _iter_base64(blocchi)
+    yield '"}'
 
-    <script>
-        // Dati JavaScript
-        const allData = {json.dumps(data)};
-        
-        let charts = {{}};
-        
-        function applyFilters() {{
-            const elementoFilter = document.getElementById('elemento-filter').value;
-            const pianoFilter = document.getElementById('piano-filter').value;
-            const diametroFilter = document.getElementById('diametro-filter').value;
-            
-            // Filtra dati
-            let filteredData = allData.filter(item => {{
-                return (elementoFilter === 'Tutti' || item.elemento === elementoFilter) &&
-                       (pianoFilter === 'Tutti' || item.piano === pianoFilter) &&
-                       (diametroFilter === 'Tutti' || item.diametro.toString() === diametroFilter);
-            }});
-            
-            // Aggiorna statistiche
-            updateStatistics(filteredData);
-            
-            // Aggiorna tabella
-            updateTable(filteredData);
-            
-            // Aggiorna grafici
-            updateCharts(filteredData);
-        }}
-        
-        function updateStatistics(data) {{
-            if (data.length === 0) {{
-                document.getElementById('total-weight').textContent = '0.00';
-                document.getElementById('avg-weight').textContent = '0.00';
-                document.getElementById('max-weight').textContent = '0.00';
-                document.getElementById('min-weight').textContent = '0.00';
-                document.getElementById('total-count').textContent = '0';
-                return;
-            }}
-            
-            const quantities = data.map(d => d.quantita);
-            const total = quantities.reduce((a, b) => a + b, 0);
-            const avg = total / quantities.length;
-            const max = Math.max(...quantities);
-            const min = Math.min(...quantities);
-            
-            document.getElementById('total-weight').textContent = total.toFixed(2);
-            document.getElementById('avg-weight').textContent = avg.toFixed(2);
-            document.getElementById('max-weight').textContent = max.toFixed(2);
-            document.getElementById('min-weight').textContent = min.toFixed(2);
-            document.getElementById('total-count').textContent = data.length;
-        }}
-        
-        function updateTable(data) {{
-            const tbody = document.getElementById('table-body');
-            tbody.innerHTML = '';
-            
-            data.forEach(item => {{
-                const row = tbody.insertRow();
-                row.insertCell(0).textContent = item.elemento;
-                row.insertCell(1).textContent = item.piano;
-                row.insertCell(2).textContent = item.diametro + ' mm';
-                row.insertCell(3).textContent = item.quantita.toFixed(2) + ' kg';
-            }});
-        }}
-        
-        function groupByField(data, field) {{
-            const groups = {{}};
-            data.forEach(item => {{
-                const key = item[field];
-                if (!groups[key]) groups[key] = 0;
-                groups[key] += item.quantita;
-            }});
-            return groups;
-        }}
-        
-        function updateCharts(data) {{
-            // Elemento chart
-            const elementData = groupByField(data, 'elemento');
-            updateBarChart('elementChart', Object.keys(elementData), Object.values(elementData), 'Peso (kg)');
-            
-            // Piano chart
-            const pianoData = groupByField(data, 'piano');
-            updateBarChart('pianoChart', Object.keys(pianoData), Object.values(pianoData), 'Peso (kg)');
-            
-            // Diametro chart
-            const diametroData = groupByField(data, 'diametro');
-            const diametroLabels = Object.keys(diametroData).map(d => d + ' mm');
-            updateBarChart('diametroChart', diametroLabels, Object.values(diametroData), 'Peso (kg)');
-            
-            // Pie chart
-            updatePieChart('pieChart', Object.keys(elementData), Object.values(elementData));
-        }}
-        
-        function updateBarChart(canvasId, labels, data, yLabel) {{
-            const ctx = document.getElementById(canvasId).getContext('2d');
-            
-            if (charts[canvasId]) {{
-                charts[canvasId].destroy();
-            }}
-            
-            charts[canvasId] = new Chart(ctx, {{
-                type: 'bar',
-                data: {{
-                    labels: labels,
-                    datasets: [{{
-                        data: data,
-                        backgroundColor: 'rgba(102, 126, 234, 0.8)',
-                        borderColor: 'rgba(102, 126, 234, 1)',
-                        borderWidth: 1
-                    }}]
-                }},
-                options: {{
-                    responsive: true,
-                    plugins: {{
-                        legend: {{
-                            display: false
-                        }}
-                    }},
-                    scales: {{
-                        y: {{
-                            beginAtZero: true,
-                            title: {{
-                                display: true,
-                                text: yLabel
-                            }}
-                        }}
-                    }}
-                }}
-            }});
-        }}
-        
-        function updatePieChart(canvasId, labels, data) {{
-            const ctx = document.getElementById(canvasId).getContext('2d');
-            
-            if (charts[canvasId]) {{
-                charts[canvasId].destroy();
-            }}
-            
-            const colors = [
-                'rgba(102, 126, 234, 0.8)',
-                'rgba(118, 75, 162, 0.8)',
-                'rgba(255, 99, 132, 0.8)',
-                'rgba(54, 162, 235, 0.8)',
-                'rgba(255, 205, 86, 0.8)',
-                'rgba(75, 192, 192, 0.8)'
-            ];
-            
-            charts[canvasId] = new Chart(ctx, {{
-                type: 'pie',
-                data: {{
-                    labels: labels,
-                    datasets: [{{
-                        data: data,
-                        backgroundColor: colors.slice(0, labels.length),
-                        borderWidth: 2,
-                        borderColor: '#fff'
-                    }}]
-                }},
-                options: {{
-                    responsive: true,
-                    plugins: {{
-                        legend: {{
-                            position: 'bottom'
-                        }}
-                    }}
-                }}
-            }});
-        }}
-        
-        // Inizializza la pagina
-        document.addEventListener('DOMContentLoaded', function() {{
-            applyFilters();
-        }});
-    </script>
-</body>
-</html>
-"""
+def build_report_payload(data, stats, comprimi=None):
+    """Payload colonnare per il report: dizionari, colonne tipizzate in base64 e aggregati globali"""
+    return json.loads(''.join(_iter_payload(data, stats, comprimi)))
+
+@lru_cache(maxsize=None)
+def carica_template(percorso=TEMPLATE_REPORT):
+    """Legge il template una sola volta e lo divide in (testo statico, segnaposto)"""
+    
+    with open(percorso, 'r', encoding='utf-8') as file:
+        testo = file.read()
+    
+    parti = []
+    inizio = 0
+    for match in SEGNAPOSTO_PATTERN.finditer(testo):
+        parti.append((testo[inizio:match.start()], match.group(1)))
+        inizio = match.end()
+    parti.append((testo[inizio:], None))
+    return tuple(parti)
+
+def _opzioni(valori, suffisso=''):
+    """Genera le <option> di un filtro una alla volta, con i valori escapati (un piano può contenere " o <)"""
+    for valore in valori:
+        valore = html.escape(str(valore), quote=True)
+        yield f'<option value="{valore}">{valore}{suffisso}</option>'
+
+def scrivi_report(data, output, comprimi=None, template=TEMPLATE_REPORT, fonte='output_ferri.txt'):
+    """Scrive il report HTML in streaming su un file aperto in testo"""
+    
+    # Calcola statistiche globali (a zero per un export valido ma senza righe)
+    risultato = calculate_statistics(data)
+    stats = risultato[0] if risultato else dict(STATISTICHE_VUOTE)
     
-    return html_content
+    # Ogni segnaposto è una stringa o un iterabile di pezzi scritti man mano
+    valori = {
+        'opzioni_elemento': _opzioni(sorted(data.valori_unici('elemento'))),
+        'opzioni_piano': _opzioni(sorted(data.valori_unici('piano'))),
+        'opzioni_diametro': _opzioni(sorted(data.valori_unici('diametro')), ' mm'),
+        'totale': f"{stats['totale']:.2f}",
+        'media': f"{stats['media']:.2f}",
+        'massimo': f"{stats['massimo']:.2f}",
+        'minimo': f"{stats['minimo']:.2f}",
+        'conteggio': str(stats['conteggio']),
+        'fonte': html.escape(fonte),
+        'generato_il': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+        'payload': _iter_payload(data, stats, comprimi)
+    }
+    
+    for testo, segnaposto in carica_template(template):
+        output.write(testo)
+        if segnaposto is None:
+            continue
+        valore = valori[segnaposto]
+        if isinstance(valore, str):
+            output.write(valore)
+        else:
+            for pezzo in valore:
+                output.write(pezzo)
+
+def generate_html_report(data, comprimi=None):
+    """Genera un report HTML interattivo"""
+    
+    output = io.StringIO()
+    scrivi_report(data, output, comprimi)
+    return output.getvalue()
 
 def main():
     """Funzione principale"""
     print("🏗️ Visualizzatore Ferri Strutturali")
     print("=====================================")
     
+    # File da analizzare: output_ferri.txt, un workbook o un archivio storico .sqlite
+    file_path = sys.argv[1] if len(sys.argv) > 1 else 'data/output_ferri.txt'
+    # Per un archivio storico, il progetto da caricare
+    progetto = sys.argv[2] if len(sys.argv) > 2 else None
+    
     # Controlla se il file esiste
-    if not os.path.exists('data/output_ferri.txt'):
+    if not os.path.exists(file_path):
         print("❌ Errore: File 'output_ferri.txt' non trovato!")
         print("   Assicurati che il file sia presente nella stessa cartella di questo script.")
         input("Premi Enter per uscire...")
@@ -549,23 +252,28 @@ def main():
     try:
         # Carica e analizza i dati
         print("📊 Caricamento dati...")
-        data = parse_ferri_data('data/output_ferri.txt')
+        statistiche = StatisticheParsing()
+        data = parse_ferri_data(file_path, statistiche, progetto)
         
         if not data:
             print("❌ Errore: Nessun dato trovato nel file!")
             input("Premi Enter per uscire...")
             return
         
-        print(f"✅ Caricati {len(data)} record")
+        print(f"✅ Caricati {len(data)} record ({data.nbytes} byte in colonne)")
+        if statistiche.righe:
+            print(f"⏱️  Parsing: {statistiche}")
+        elif e_file_storico(file_path):
+            print(f"🗄️ Dati letti dall'archivio storico (ultima esecuzione di '{data.sorgenti[0]['progetto']}')")
+        else:
+            print("⚡ Dati letti dal sidecar binario (file sorgente invariato)")
         
         # Genera report HTML
         print("🌐 Generazione report HTML...")
-        html_content = generate_html_report(data)
-        
-        # Salva il file HTML
+        # Salva il file HTML, scritto in streaming dal template
         output_file = 'ferri_report.html'
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            scrivi_report(data, f, fonte=os.path.basename(file_path))
         
         print(f"✅ Report salvato come '{output_file}'")
         